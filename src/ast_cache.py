@@ -0,0 +1,120 @@
+# src/ast_cache.py
+
+'''
+Persistent on-disk cache of parsed pages.
+
+Entries are pickled (title, node tree) pairs keyed by a hash of the markdown source,
+the basepath, the asset fingerprints, the settings of the images the page shows (see
+urls, images) and markdown_to_node.PARSER_VERSION, so editing the parser invalidates
+everything at once.
+Eviction is size-based: least recently used entries are dropped once the cache
+directory grows past max_bytes.
+'''
+
+import hashlib
+import os
+import pickle
+
+import markdown_to_node
+import urls
+
+DEFAULT_MAX_BYTES = 256 << 20
+
+# huge pages are streamed instead (see generate_page.build_page) and never cached
+MAX_SOURCE_BYTES = 1 << 20
+
+
+class ASTCache():
+
+    '''Cache directory handle plus hit/miss counters for this process'''
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown, basepath="/"):
+        '''Content hash identifying a parse of markdown with this parser version'''
+
+        image_settings = markdown_to_node.image_settings_key(markdown)
+        settings = f"{urls.fingerprints_key()}\0{image_settings}"
+        digest = hashlib.sha256(
+            f"{markdown_to_node.PARSER_VERSION}\0{basepath}\0{settings}\0".encode())
+        digest.update(markdown.encode('utf-8'))
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pickle")
+
+    def get(self, key):
+        '''Returns the cached value for key, or None on a miss'''
+
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception:
+            # missing, truncated or written by incompatible code: all just misses
+            self.misses += 1
+            return None
+
+        # refresh mtime so eviction treats this entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        '''Stores value under key; written atomically so parallel workers can share a cache'''
+
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        '''
+        Deletes least recently used entries until the cache fits in max_bytes.
+        Returns the number of entries removed.
+        '''
+
+        entries = []
+        total = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def parse_page(self, markdown, basepath="/"):
+        '''Cached markdown_to_node.markdown_to_page: returns (title, div node) for markdown'''
+
+        key = self.key(markdown, basepath)
+        page = self.get(key)
+        if page is None:
+            page = markdown_to_node.markdown_to_page(markdown, basepath)
+            self.put(key, page)
+        return page
+
+    def markdown_to_html_node(self, markdown, basepath="/"):
+        '''Cached markdown_to_node.markdown_to_html_node'''
+
+        return self.parse_page(markdown, basepath)[1]
@@ -0,0 +1,114 @@
+# src/batch.py
+
+'''
+Library API for rendering many markdown documents in one call, e.g. from a CMS
+that would otherwise start a generator process per document:
+
+    import batch
+
+    renderer = batch.BatchRenderer("template.html", basepath="/site/")
+    for doc_id, html, error in renderer.render_many(documents, jobs=4):
+        ...
+
+documents is any iterable of (id, markdown) pairs and is consumed lazily; results come
+back in input order. The compiled template, the block cache and (with cache_dir) the
+on-disk AST cache are shared by every document rendered in the same process.
+'''
+
+import collections
+import itertools
+
+import ast_cache
+import generate_page
+import markdown_to_node
+import templates
+
+DEFAULT_CHUNK_SIZE = 32
+
+
+class BatchRenderer():
+
+    '''
+    Renders markdown to HTML pages in template_path, or with no template_path,
+    to the content HTML only (the <div> markdown_to_html_node would produce).
+    '''
+
+    def __init__(self, template_path=None, basepath="/", cache_dir=None):
+        self.template_path = template_path
+        self.basepath = basepath
+        self.cache_dir = cache_dir
+        self.cache = ast_cache.ASTCache(cache_dir) if cache_dir else None
+
+    def render(self, markdown):
+        '''Returns the HTML for one markdown document; raises ValueError on bad markdown'''
+
+        if self.cache is not None and len(markdown) <= ast_cache.MAX_SOURCE_BYTES:
+            title, node = self.cache.parse_page(markdown, self.basepath)
+            if self.template_path is None:
+                return node.to_html()
+            if title is None:
+                raise ValueError("No toplevel header found in markdown")
+            return templates.render_template(self.template(), Title=title,
+                                             Content=node.to_html())
+
+        if self.template_path is None:
+            return markdown_to_node.markdown_to_html(markdown, self.basepath)
+        return generate_page.render_page(self.basepath, markdown, self.template())
+
+    def template(self):
+        # compiled once per process, recompiled only if the file changes
+        return templates.load_template(self.template_path, self.basepath)
+
+    def render_chunk(self, documents):
+        '''Returns [(id, html or None, error message or None)] for (id, markdown) pairs'''
+
+        results = []
+        for doc_id, markdown in documents:
+            try:
+                results.append((doc_id, self.render(markdown), None))
+            except Exception as e:
+                results.append((doc_id, None, f"{type(e).__name__}: {e}"))
+        return results
+
+    def render_many(self, documents, jobs=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Yields (id, html or None, error message or None) for each (id, markdown) pair in
+        documents, in order. A document that fails doesn't stop the batch.
+
+        With jobs > 1, chunks of chunk_size documents are rendered by a pool of jobs
+        processes; only a few chunks per worker are in flight at once, so documents can
+        be an arbitrarily long generator.
+        '''
+
+        if jobs <= 1:
+            for document in documents:
+                yield self.render_chunk([document])[0]
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        documents = iter(documents)
+        settings = (self.template_path, self.basepath, self.cache_dir)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = collections.deque()
+            while True:
+                while len(pending) < jobs * 2:
+                    chunk = list(itertools.islice(documents, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_render_chunk, settings, chunk))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+def _render_chunk(settings, chunk):
+    '''Process pool work unit: renders a chunk with a worker-local BatchRenderer'''
+
+    return BatchRenderer(*settings).render_chunk(chunk)
+
+def render_many(documents, template_path=None, basepath="/", jobs=1, cache_dir=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    '''One-off shortcut for BatchRenderer(template_path, basepath, cache_dir).render_many'''
+
+    renderer = BatchRenderer(template_path, basepath, cache_dir)
+    yield from renderer.render_many(documents, jobs, chunk_size)
@@ -0,0 +1,507 @@
+# src/benchmark.py
+
+'''
+Benchmarks for the markdown pipeline.
+Run from the site-generator root: python3 src/benchmark.py (or ./bench.sh)
+
+Every benchmark prints a table and returns result records, which --json saves
+so runs from different commits can be compared with --compare.
+'''
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import generate_page
+import markdown_to_node
+
+from blocktype import BlockType
+from dictionaries import block_dict
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+
+def legacy_split_nodes_pattern(old_nodes, split_pattern, extract, text_type):
+    '''
+    The original image/link splitter: re.split on the pattern, then each captured alt text
+    is looked up again among the extracted (text, url) pairs
+    '''
+
+    if not old_nodes:
+        return []
+    new_nodes = []
+
+    for node in old_nodes:
+        converted_nodes = []
+
+        if node.text_type.name != "TEXT":
+            new_nodes.append(node)
+
+        else:
+            pairs = extract(node.text)
+            converted_text = re.split(split_pattern, node.text)
+            # URLs are not included in converted_text
+
+            for phrase in converted_text:
+                if any(phrase in pair for pair in pairs):
+                    url = next(u for (a, u) in pairs if a == phrase)
+                    converted_nodes.append(TextNode(phrase, text_type, url))
+                elif phrase != "":
+                    converted_nodes.append(TextNode(phrase, TextType.TEXT))
+
+            new_nodes.extend(converted_nodes)
+
+    return new_nodes
+
+def chained_text_to_text_nodes(text):
+    '''
+    The original five-pass inline parser (the original image and link splitters, then
+    split_nodes_delimiter per delimiter), kept as a baseline for the single-pass lexer
+    '''
+
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = legacy_split_nodes_pattern(
+        nodes, r"\!\[(.*?)\]\(.*?\)",
+        lambda text: re.findall(r"\!\[(.*?)\]\((.*?)\)", text), TextType.IMAGE)
+    nodes = legacy_split_nodes_pattern(
+        nodes, r"(?<!\!)\[(.*?)\]\(.*?\)",
+        lambda text: re.findall(r"(?<!\!)\[(.*?)\]\((.*?)\)", text), TextType.LINK)
+    nodes = markdown_to_node.split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = markdown_to_node.split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    return markdown_to_node.split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+
+def legacy_block_to_block_type(text):
+    '''The old classifier (re.match per line, one all() scan per type), kept as a baseline'''
+
+    if re.match(r"^#{1,6} ", text):
+        return BlockType.HEADING
+    if text.startswith("```\n") and text.endswith("```"):
+        return BlockType.CODE
+    lines = text.split("\n")
+    if all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    if all(line.startswith("- ") for line in lines):
+        return BlockType.UNORDERED_LIST
+    if all((matches := re.match(r'^(\d+)\. ', line)) and int(matches.group(1)) == index
+           for index, line in enumerate(lines, start=1)):
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+def legacy_block_to_node(block, basepath="/"):
+    '''The old router: dispatch on block_type.name, converters re-split the block'''
+
+    block_type = legacy_block_to_block_type(block)
+    tag = block_dict[block_type.name]
+    if block_type.name == "HEADING":
+        tag, children = markdown_to_node.convert_heading(block, basepath)
+    elif block_type.name == "CODE":
+        children = markdown_to_node.convert_codeblock(block)
+    elif block_type.name == "QUOTE":
+        children = markdown_to_node.convert_quote(block, basepath)
+    elif block_type.name in ("ORDERED_LIST", "UNORDERED_LIST"):
+        children = markdown_to_node.convert_list(block, tag, basepath)
+    else:
+        children = markdown_to_node.text_to_children(block, basepath)
+    return ParentNode(tag, children)
+
+class UnslottedLeafNode():
+
+    '''The old LeafNode layout (instance __dict__, copied props), kept as a memory baseline'''
+
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = {key: props[key] for key in props} if props else None
+
+class UnslottedParentNode():
+
+    '''The old ParentNode layout (instance __dict__, copied children), kept as a memory baseline'''
+
+    def __init__(self, tag, children, props=None):
+        self.tag = tag
+        self.value = None
+        self.children = list(children)
+        self.props = {key: props[key] for key in props} if props else None
+
+class UnslottedTextNode():
+
+    '''The old TextNode layout (instance __dict__), kept as a memory baseline'''
+
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+def link_heavy_paragraph(count):
+    '''Paragraph made mostly of links and images'''
+
+    return " ".join(
+        f"see [link {i}](https://example.com/{i}) and ![image {i}](/images/{i}.png)"
+        for i in range(count))
+
+def emphasis_heavy_paragraph(count):
+    '''Paragraph made mostly of bold, italic and code spans'''
+
+    return " ".join(
+        f"some **bold {i}** words, _italic {i}_ words and `code {i}`" for i in range(count))
+
+def time_call(func, arg, repeat=5):
+    '''Returns the best wall time of a single func(arg) call, in seconds'''
+
+    timer = timeit.Timer(lambda: func(arg))
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops
+
+def result(benchmark, case, variant, seconds, size=None, unit="s/call"):
+    '''One machine-readable benchmark record; size (bytes) adds throughput'''
+
+    record = {"benchmark": benchmark, "case": case, "variant": variant,
+              "value": seconds, "unit": unit}
+    if size:
+        record["mb_per_s"] = size / seconds / 1e6 if seconds else None
+    return record
+
+def print_results(results):
+    print(f"{'case':<28}{'variant':<26}{'value':>14}{'MB/s':>10}")
+    for record in results:
+        throughput = record.get("mb_per_s")
+        throughput = f"{throughput:>10.2f}" if throughput else f"{'':>10}"
+        print(f"{record['case']:<28}{record['variant']:<26}"
+              f"{record['value']:>12.6g} {record['unit'][:1]}{throughput}")
+
+def bench_inline(scale=1):
+    '''Inline parsing throughput, single-pass lexer vs chained passes'''
+
+    results = []
+    for name, make in (("link-heavy", link_heavy_paragraph),
+                       ("emphasis-heavy", emphasis_heavy_paragraph)):
+        for count in (10, 1000 * scale):
+            text = make(count)
+            assert (markdown_to_node.text_to_text_nodes(text)
+                    == chained_text_to_text_nodes(text))
+            for parser, func in (("lexer", markdown_to_node.text_to_text_nodes),
+                                 ("chained", chained_text_to_text_nodes)):
+                results.append(result("inline", f"{name} x{count}", parser,
+                                      time_call(func, text), len(text)))
+    return results
+
+def build_tree(count, leaf_class, parent_class, text_class):
+    '''
+    Builds the nodes a page of count list items produces: per item one TextNode,
+    one link LeafNode and one li ParentNode, all under a single ul.
+    Strings are shared so only node overhead is measured.
+    '''
+
+    text, url = "item", "https://example.com"
+    text_nodes, items = [], []
+    for _ in range(count):
+        text_nodes.append(text_class(text, TextType.LINK, url))
+        items.append(parent_class("li", [leaf_class("a", text, {"href": url})]))
+    return text_nodes, parent_class("ul", items)
+
+def measure_bytes(func, *args):
+    '''Returns (func's return value, bytes still allocated by func once it returns)'''
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = func(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+def bench_memory(scale=1):
+    '''Per-item node footprint, slotted nodes vs the old unslotted layout'''
+
+    count = 10000 * scale
+    results = []
+    for name, classes in (
+            ("slotted", (LeafNode, ParentNode, TextNode)),
+            ("unslotted", (UnslottedLeafNode, UnslottedParentNode, UnslottedTextNode))):
+        _, allocated = measure_bytes(build_tree, count, *classes)
+        results.append(result("memory", f"list items x{count}", name,
+                              allocated / count, unit="bytes/item"))
+    return results
+
+
+# synthetic corpora
+
+def random_words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+WORDS = ("hobbit ring shire elf wizard river mountain road song tale "
+         "forest king tower stone light shadow").split()
+
+def synthetic_block(rng, shape):
+    '''One markdown block; shape skews the mix of block types'''
+
+    kind = rng.choice(SHAPE_BLOCKS[shape])
+    if kind == "paragraph":
+        return (f"{random_words(rng, 12)} **{random_words(rng, 2)}** {random_words(rng, 8)} "
+                f"_{random_words(rng, 2)}_ and `{rng.choice(WORDS)}` {random_words(rng, 10)}")
+    if kind == "links":
+        return " ".join(
+            f"[{random_words(rng, 2)}](/blog/{rng.choice(WORDS)}) "
+            f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)"
+            for _ in range(8))
+    if kind == "list":
+        items = [f"{random_words(rng, 6)} _{rng.choice(WORDS)}_" for _ in range(10)]
+        if rng.random() < 0.5:
+            return "\n".join(f"- {item}" for item in items)
+        return "\n".join(f"{i}. {item}" for i, item in enumerate(items, start=1))
+    if kind == "code":
+        lines = [f"    {random_words(rng, 5)} = **not_bold**" for _ in range(15)]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "quote":
+        return "\n".join(f"> {random_words(rng, 10)}" for _ in range(4))
+    return f"## {random_words(rng, 4)}"
+
+SHAPE_BLOCKS = {
+    "mixed": ["paragraph", "paragraph", "links", "list", "code", "quote", "heading"],
+    "link-heavy": ["links", "links", "links", "paragraph"],
+    "list-heavy": ["list", "list", "list", "paragraph"],
+    "code-heavy": ["code", "code", "code", "paragraph"],
+    "quote-heavy": ["quote", "quote", "quote", "paragraph"],
+}
+
+def synthetic_page(rng, shape, blocks):
+    body = [synthetic_block(rng, shape) for _ in range(blocks)]
+    return "\n\n".join([f"# {random_words(rng, 3)}"] + body) + "\n"
+
+CORPORA = {
+    # name: (block shape, pages, blocks per page) at scale 1
+    "small-posts": ("mixed", 200, 10),
+    "huge-pages": ("mixed", 2, 5000),
+    "link-heavy": ("link-heavy", 50, 40),
+    "list-heavy": ("list-heavy", 50, 40),
+    "code-heavy": ("code-heavy", 50, 40),
+    "quote-heavy": ("quote-heavy", 50, 40),
+}
+
+def make_corpus(name, scale=1, seed=0):
+    '''Returns {relative .md path: markdown} for a named corpus, deterministic per seed'''
+
+    shape, pages, blocks = CORPORA[name]
+    rng = random.Random(seed)
+    if name == "huge-pages":
+        blocks *= scale
+    else:
+        pages *= scale
+    return {os.path.join(f"section{i % 10}", f"page{i}.md"): synthetic_page(rng, shape, blocks)
+            for i in range(pages)}
+
+def best_time(func, repeat=3):
+    '''Best wall time of func() over repeat runs, in seconds'''
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_pipeline(scale=1):
+    '''Times each pipeline stage over every synthetic corpus'''
+
+    results = []
+    for corpus_name in CORPORA:
+        corpus = make_corpus(corpus_name, scale)
+        documents = list(corpus.values())
+        size = sum(len(markdown.encode('utf-8')) for markdown in documents)
+        blocks = [block for markdown in documents
+                  for block in markdown_to_node.markdown_to_blocks(markdown)]
+        paragraphs = [block for block in blocks
+                      if markdown_to_node.block_to_block_type(block) == BlockType.PARAGRAPH]
+        trees = [markdown_to_node.markdown_to_html_node(markdown) for markdown in documents]
+
+        stages = [
+            ("markdown_to_blocks", lambda: [markdown_to_node.markdown_to_blocks(markdown)
+                                            for markdown in documents]),
+            ("block_to_block_type", lambda: [markdown_to_node.block_to_block_type(block)
+                                             for block in blocks]),
+            ("text_to_text_nodes", lambda: [markdown_to_node.text_to_text_nodes(block)
+                                            for block in paragraphs]),
+            ("markdown_to_html_node", lambda: [markdown_to_node.markdown_to_html_node(markdown)
+                                               for markdown in documents]),
+            ("to_html", lambda: [tree.to_html() for tree in trees]),
+            ("markdown_to_html (direct)", lambda: [markdown_to_node.markdown_to_html(markdown)
+                                                   for markdown in documents]),
+        ]
+        for stage, func in stages:
+            results.append(result("pipeline", corpus_name, stage, best_time(func), size))
+    return results
+
+def bench_blocks(scale=1):
+    '''Block classification and conversion, single-pass classifier vs the old one'''
+
+    results = []
+    for corpus_name in ("list-heavy", "quote-heavy", "small-posts"):
+        blocks = [block for markdown in make_corpus(corpus_name, scale).values()
+                  for block in markdown_to_node.markdown_to_blocks(markdown)]
+        size = sum(len(block.encode('utf-8')) for block in blocks)
+        cases = [
+            ("classify", "classify_block", lambda: [markdown_to_node.classify_block(block)
+                                                    for block in blocks]),
+            ("classify", "legacy", lambda: [legacy_block_to_block_type(block)
+                                            for block in blocks]),
+            ("block_to_node", "dispatch table", lambda: [markdown_to_node.block_to_node(block)
+                                                         for block in blocks]),
+            ("block_to_node", "legacy", lambda: [legacy_block_to_node(block)
+                                                 for block in blocks]),
+        ]
+        for stage, variant, func in cases:
+            results.append(result("blocks", f"{corpus_name} {stage}", variant,
+                                  best_time(func), size))
+    return results
+
+def write_corpus(corpus, content_dir):
+    for rel_path, markdown in corpus.items():
+        path = os.path.join(content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+
+def bench_build(scale=1):
+    '''Times full generate_pages_recursive builds of every synthetic corpus'''
+
+    results = []
+    template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                                 "template.html")
+    for corpus_name in CORPORA:
+        corpus = make_corpus(corpus_name, scale)
+        size = sum(len(markdown.encode('utf-8')) for markdown in corpus.values())
+        with tempfile.TemporaryDirectory() as tmp:
+            content_dir = os.path.join(tmp, "content")
+            write_corpus(corpus, content_dir)
+            runs = itertools.count()
+
+            def build():
+                # every run starts cold: empty block caches and a fresh output folder, so
+                # no page is a cache hit or an unchanged output skipped by the writer;
+                # per-page progress lines would dominate the timing
+                markdown_to_node.clear_block_caches()
+                dest_dir = os.path.join(tmp, f"docs{next(runs)}")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_page.generate_pages_recursive("/", content_dir, template_path,
+                                                           dest_dir)
+
+            results.append(result("build", f"{corpus_name} ({len(corpus)} pages)",
+                                  "generate_pages_recursive", best_time(build), size))
+    return results
+
+def bench_startup(scale=1):
+    '''
+    Process startup costs, each in a fresh interpreter: bare startup, importing the
+    renderer and main.py, and an incremental build with nothing to do
+    '''
+
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    main_path = os.path.join(src_dir, "main.py")
+
+    def run(args, cwd=src_dir):
+        subprocess.run([sys.executable] + args, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    results = []
+    for variant, args in (("python -c pass", ["-c", "pass"]),
+                          ("import markdown_to_node", ["-c", "import markdown_to_node"]),
+                          ("import main", ["-c", "import main"])):
+        results.append(result("startup", "interpreter", variant,
+                              best_time(lambda: run(args), repeat=5)))
+
+    corpus = make_corpus("small-posts", scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(corpus, os.path.join(tmp, "content"))
+        os.makedirs(os.path.join(tmp, "static"))
+        with open(os.path.join(tmp, "template.html"), 'w', encoding='utf-8') as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        build = [main_path, "build", "--incremental"]
+        run(build, tmp)
+        results.append(result("startup", f"no-op build ({len(corpus)} pages)",
+                              "main.py --incremental", best_time(lambda: run(build, tmp))))
+    return results
+
+BENCHMARKS = {
+    "inline": bench_inline,
+    "memory": bench_memory,
+    "blocks": bench_blocks,
+    "pipeline": bench_pipeline,
+    "build": bench_build,
+    "startup": bench_startup,
+}
+
+
+# machine-readable output
+
+def run_metadata(scale):
+    '''Where and on what the benchmarks ran, saved alongside the results'''
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "scale": scale,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(results, baseline_path):
+    '''Prints each result against the matching one in a saved --json run'''
+
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old_values = {(r["benchmark"], r["case"], r["variant"]): r["value"]
+                  for r in baseline["results"]}
+
+    print(f"=== compared with {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'benchmark':<10}{'case':<28}{'variant':<26}{'old':>12}{'new':>12}{'ratio':>8}")
+    for record in results:
+        key = (record["benchmark"], record["case"], record["variant"])
+        if key not in old_values:
+            continue
+        old, new = old_values[key], record["value"]
+        ratio = new / old if old else float("nan")
+        print(f"{key[0]:<10}{key[1]:<28}{key[2]:<26}{old:>12.6g}{new:>12.6g}{ratio:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the markdown pipeline")
+    parser.add_argument("names", nargs="*",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="multiplies corpus sizes (pages, or blocks for huge pages)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="compare with results previously written by --json")
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    all_results = []
+    for name in names:
+        print(f"=== {name}")
+        benchmark_results = BENCHMARKS[name](args.scale)
+        print_results(benchmark_results)
+        all_results.extend(benchmark_results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"meta": run_metadata(args.scale), "results": all_results}, f, indent=2)
+        print(f">>> Results written to {args.json}")
+    if args.compare:
+        compare(all_results, args.compare)
@@ -12,13 +12,32 @@ import logging
 import os
 import shutil
 import sys
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 
-def copy_static(src_dir, dest_dir):
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+import manifest
+
+
+def copy_static(src_dir, dest_dir, clean=True, workers=None, keep=()):
     '''
     Deletes contents of destination directory ("public")
     and recursively copies contents from source directory ("static").
 
+    With clean=False the destination is left in place and files are copied over it,
+    so previously generated pages survive for incremental builds.
+    keep lists files (paths relative to dest_dir) that cleaning leaves in place, such as
+    the pages a full build is about to regenerate, so unchanged ones aren't rewritten.
+
+    The source tree is walked once, every destination directory is created up front,
+    then files are copied concurrently by a pool of workers threads
+    (None: ThreadPoolExecutor's default). Returns (files copied, bytes copied).
+
     ALL RELATIVE FILE PATHS ARE RELATIVE TO THE ROOT DIRECTORY ("site-generator").
     This script lives in site-generator/src/ but is called from site-generator root.
     '''
@@ -43,20 +62,13 @@ def copy_static(src_dir, dest_dir):
         sys.exit(1)
 
     # delete contents of destination folder (if it exists and contains anything)
-    if not os.path.exists(abs_dest_dir) or not os.listdir(abs_dest_dir):
+    if not clean or not os.path.exists(abs_dest_dir) or not os.listdir(abs_dest_dir):
     #     logging.info('Destination folder does not exist or is already empty')
         pass
 
     else:
         try:
-            for item in os.listdir(abs_dest_dir):
-                item_path = os.path.join(abs_dest_dir,item)
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                    # logging.info('Recursively deleted %s/%s/', dest_dir, item)
-                elif item != '.DS_Store':
-                    os.remove(item_path)
-            #         logging.info('Deleted %s/%s', dest_dir, item)
+            clear_dir(abs_dest_dir, {os.path.normpath(path) for path in keep})
             # logging.info('Destination folder cleared')
 
         except Exception as e:
@@ -64,28 +76,241 @@ def copy_static(src_dir, dest_dir):
             print(f"!!! Something went wrong while clearing destination folder: {e}")
             sys.exit(1)
 
-    # recursively copy src_dir files/subdirectories
-    # create destination dir as needed
-    if not os.path.exists(abs_dest_dir):
-        os.mkdir(abs_dest_dir)
-
-    # get list of src_dir contents and iterate
-    src_contents = os.listdir(abs_src_dir)
+    # walk src_dir once, then create all destination dirs in one batch
+    start = time.perf_counter()
     try:
-        for src_item in src_contents:
-            src_item_path = os.path.join(abs_src_dir, src_item)
-            # if item is file, copy the file
-            if os.path.isfile(src_item_path) and src_item != '.DS_Store':
-                # logging.info('Copying %s', src_item)
-                shutil.copy(src_item_path, abs_dest_dir)
-            # if item is folder, call copy_static with it
-            elif os.path.isdir(src_item_path):
-                # logging.info('Recursively copying %s', src_item_path)
-                dest_item_path = os.path.join(abs_dest_dir, src_item)
-                copy_static(src_item_path, dest_item_path)
+        dest_dirs = [abs_dest_dir]
+        copies = []
+        for rel_path, entry in scan_tree(abs_src_dir):
+            dest_item_path = os.path.join(abs_dest_dir, rel_path)
+            if entry.is_dir():
+                dest_dirs.append(dest_item_path)
+            else:
+                copies.append((entry.path, dest_item_path, entry.stat().st_size))
+
+        for dest_item_path in dest_dirs:
+            os.makedirs(dest_item_path, exist_ok=True)
+
+        # copy files concurrently; copying is I/O bound, so threads overlap nicely
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first copy error here
+            list(executor.map(lambda copy: copy_file(copy[0], copy[1]), copies))
     except Exception as e:
     #     logging.error('Something went wrong while copying: %s', e)
         print(f"!!! Something went wrong while copying: {e}")
         sys.exit(1)
 
     # logging.info('%s contents successfully copied to %s', src_dir, dest_dir)
+    copied_bytes = sum(size for _, _, size in copies)
+    report_copy(len(copies), copied_bytes, time.perf_counter() - start)
+    return len(copies), copied_bytes
+
+def clear_dir(dest_dir, keep=frozenset()):
+    '''
+    Deletes everything in dest_dir except the files in keep (paths relative to dest_dir)
+    and the folders holding them. Top-level .DS_Store files are left alone.
+    '''
+
+    keep_dirs = set()
+    for path in keep:
+        path = os.path.dirname(path)
+        while path and path not in keep_dirs:
+            keep_dirs.add(path)
+            path = os.path.dirname(path)
+
+    def clear(rel_dir):
+        for item in os.listdir(os.path.join(dest_dir, rel_dir)):
+            rel_path = os.path.join(rel_dir, item)
+            item_path = os.path.join(dest_dir, rel_path)
+            if os.path.isdir(item_path):
+                if rel_path in keep_dirs:
+                    clear(rel_path)
+                else:
+                    shutil.rmtree(item_path)
+                    # logging.info('Recursively deleted %s/%s/', dest_dir, item)
+            elif rel_path not in keep and (rel_dir or item != '.DS_Store'):
+                os.remove(item_path)
+                # logging.info('Deleted %s/%s', dest_dir, item)
+
+    clear("")
+
+def report_copy(files, copied_bytes, seconds):
+    '''Prints file count, size and throughput of a copy'''
+
+    rate = copied_bytes / seconds / 1e6 if seconds > 0 else 0.0
+    print(f">>> Copied {files} files ({copied_bytes / 1e6:.1f} MB) "
+          f"in {seconds:.2f}s, {rate:.1f} MB/s")
+
+
+# scanning and copying helpers
+
+FICLONE = 0x40049409  # linux ioctl: copy-on-write clone of a whole file (btrfs, xfs)
+
+
+def scan_tree(src_dir, rel_dir=""):
+    '''
+    Yields (relative path, os.DirEntry) for every directory and file under src_dir,
+    each directory before its contents. .DS_Store files are skipped.
+    '''
+
+    with os.scandir(os.path.join(src_dir, rel_dir)) as entries:
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            if entry.is_dir():
+                yield rel_path, entry
+                yield from scan_tree(src_dir, rel_path)
+            elif entry.is_file() and entry.name != '.DS_Store':
+                yield rel_path, entry
+
+def scan_files(src_dir):
+    '''Yields (relative path, os.DirEntry) for every file under src_dir, skipping .DS_Store'''
+
+    for rel_path, entry in scan_tree(src_dir):
+        if not entry.is_dir():
+            yield rel_path, entry
+
+def clone_file(src_path, dest_path):
+    '''
+    Copies file contents, cheapest method first:
+    reflink (copy-on-write, no data copied), then copy_file_range (in-kernel),
+    then shutil.copyfile.
+    '''
+
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+                return
+            except OSError:
+                pass
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+            except OSError:
+                pass
+            src.seek(0)
+            dest.seek(0)
+            dest.truncate()
+
+        shutil.copyfileobj(src, dest)
+
+def copy_file(src_path, dest_path):
+    '''shutil.copy equivalent (contents and permission bits) built on clone_file'''
+
+    clone_file(src_path, dest_path)
+    shutil.copymode(src_path, dest_path)
+
+# incremental sync
+
+def sync_file(src_path, dest_path, src_stat, hardlink=False):
+    '''
+    Replaces dest_path with a copy of (or, with hardlink, a link to) src_path.
+    Copies keep the source mtime so the next sync can tell they are current.
+    The new file is put in place with a rename, so dest_path is never half-written.
+    '''
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if os.path.isdir(dest_path):
+        shutil.rmtree(dest_path)
+
+    tmp_path = f"{dest_path}.sync-tmp"
+    if hardlink:
+        try:
+            os.link(src_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return
+        except OSError:
+            # cross-device or unsupported filesystem: fall back to copying
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    clone_file(src_path, tmp_path)
+    os.utime(tmp_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    os.replace(tmp_path, dest_path)
+
+def is_synced(dest_path, record, old_record):
+    '''
+    True if dest_path already holds the file described by record.
+    Size must match; then either content hashes (if recorded) or mtimes must match.
+    '''
+
+    try:
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    if dest_stat.st_size != record["size"]:
+        return False
+    if "hash" in record:
+        return old_record is not None and old_record.get("hash") == record["hash"]
+    return dest_stat.st_mtime_ns == record["mtime_ns"]
+
+def sync_static(src_dir, dest_dir, manifest_path, use_hash=False, hardlink=False,
+                workers=None):
+    '''
+    Incremental alternative to copy_static: leaves dest_dir in place, copies only
+    files whose size/mtime (or content hash, with use_hash) changed, and deletes files
+    that a previous sync copied but that are no longer in src_dir.
+
+    The record of synced files lives at manifest_path, so generated pages that share
+    dest_dir are never touched. Changed files are copied by a pool of workers threads.
+
+    Returns (copied, unchanged, removed) file counts.
+    '''
+
+    if not os.path.isdir(src_dir):
+        print(f"!!! Static directory not found: {src_dir}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    old_files = manifest.load_manifest(manifest_path)
+    new_files = {}
+    pending = []
+    unchanged = 0
+
+    for rel_path, entry in scan_files(src_dir):
+        src_stat = entry.stat()
+        record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        if use_hash:
+            record["hash"] = manifest.hash_file(entry.path)
+        new_files[rel_path] = record
+
+        dest_path = os.path.join(dest_dir, rel_path)
+        if is_synced(dest_path, record, old_files.get(rel_path)):
+            unchanged += 1
+        else:
+            pending.append((entry.path, dest_path, src_stat))
+
+    for dest_item_dir in {os.path.dirname(dest_path) for _, dest_path, _ in pending}:
+        os.makedirs(dest_item_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda sync: sync_file(*sync, hardlink), pending))
+    copied = len(pending)
+
+    removed = 0
+    for rel_path in old_files:
+        if rel_path in new_files:
+            continue
+        stale_path = os.path.join(dest_dir, rel_path)
+        if os.path.isfile(stale_path):
+            os.remove(stale_path)
+            removed += 1
+            # tidy up directories the stale file leaves empty
+            stale_dir = os.path.dirname(stale_path)
+            while (os.path.abspath(stale_dir) != os.path.abspath(dest_dir)
+                   and not os.listdir(stale_dir)):
+                os.rmdir(stale_dir)
+                stale_dir = os.path.dirname(stale_dir)
+
+    manifest.save_manifest(manifest_path, new_files)
+    print(f">>> Static sync: {copied} copied, {unchanged} unchanged, {removed} removed")
+    report_copy(copied, sum(stat.st_size for _, _, stat in pending),
+                time.perf_counter() - start)
+    return copied, unchanged, removed
@@ -0,0 +1,151 @@
+# src/depgraph.py
+
+'''
+Dependency graph for incremental builds.
+
+Alongside its source hash, each page's manifest entry records what else its output
+depends on:
+
+    template  the template path, plus a hash of the template as compiled for the
+              basepath (template_hash)
+    refs      the root-relative image and link URLs in the page (extracted with
+              extract_markdown_images/extract_markdown_links)
+    assets    the static files the refs resolve to
+    pages     markdown sources of the other pages the refs link to
+    fingerprinted
+              {ref: fingerprinted URL} for the refs that were rendered as fingerprinted
+              copies (see urls)
+    images    every image URL in the page, external ones included (they get img
+              attributes too)
+    image_settings
+              images.images_key of those images if img attributes were enabled
+    minified  True if the page was built with minification (see minify)
+
+basepath is only recorded for pages that have refs, because those are the only pages
+whose output it changes (the template's own links are covered by template_hash).
+A page is rebuilt when any of that changes, except assets, pages and images: the
+output only holds their URLs, so an asset's bytes only matter once fingerprinting puts
+its hash in the URL, and an image's size only through image_settings. Sources are only
+read again when their size or mtime changes, and refs and images only extracted again
+when their hash does; resolving refs (and reporting broken internal links) just looks
+at which files exist. responsive reuses the recorded images the same way.
+'''
+
+import hashlib
+import os
+
+import markdown_to_node
+import templates
+
+
+def template_hash(template_path, basepath="/"):
+    '''Hash of the template as compiled for basepath: changes with either one'''
+
+    segments = templates.load_template(template_path, basepath)
+    return hashlib.sha256("\0".join(segments).encode('utf-8')).hexdigest()
+
+def page_references(markdown):
+    '''
+    Returns (refs, images) for markdown: the sorted, distinct root-relative image and
+    link URLs, and the sorted, distinct URLs of every image. Fenced code blocks are
+    skipped, since their contents never become links or images.
+    '''
+
+    refs, image_urls = set(), set()
+    for block in markdown_to_node.markdown_to_blocks(markdown):
+        if block.startswith("```\n") and block.endswith("```"):
+            continue
+        for _, url in markdown_to_node.extract_markdown_images(block):
+            image_urls.add(url)
+        for _, url in markdown_to_node.extract_markdown_links(block):
+            refs.add(url)
+    refs.update(image_urls)
+    return sorted(url for url in refs if url.startswith("/")), sorted(image_urls)
+
+def read_page(from_path, old_entry=None):
+    '''
+    Returns {"source_hash", "size", "mtime_ns", "refs", "images"} for the markdown file
+    at from_path. old_entry's values are reused while the file's size and mtime are
+    unchanged; otherwise the file is read once, and refs and images are only extracted
+    again if its hash changed.
+    '''
+
+    src_stat = os.stat(from_path)
+    page = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+    # entries written before images were recorded have nothing to reuse
+    old_entry = old_entry if old_entry and "images" in old_entry else {}
+    if (old_entry.get("size"), old_entry.get("mtime_ns")) == (page["size"], page["mtime_ns"]):
+        page["source_hash"] = old_entry["source_hash"]
+    else:
+        with open(from_path, 'rb') as f:
+            source = f.read()
+        page["source_hash"] = hashlib.sha256(source).hexdigest()
+        if old_entry.get("source_hash") != page["source_hash"]:
+            markdown = source.decode('utf-8', errors='replace')
+            page["refs"], page["images"] = page_references(markdown)
+            return page
+    page["refs"], page["images"] = old_entry["refs"], old_entry["images"]
+    return page
+
+def url_path(url):
+    '''"/blog/tom?x=1#top" -> "blog/tom"'''
+
+    return url.split("#", 1)[0].split("?", 1)[0].lstrip("/")
+
+
+class DependencyGraph():
+
+    '''Resolves page refs against the content and static trees of one build'''
+
+    def __init__(self, content_dir, static_dir, sources):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.sources = set(sources)
+
+    def resolve(self, url):
+        '''
+        Returns ("asset", static path) or ("page", markdown source) for a root-relative
+        URL, or None if it points at nothing this build produces
+        '''
+
+        path = url_path(url)
+
+        if self.static_dir and path:
+            asset_path = os.path.join(self.static_dir, path)
+            if os.path.isfile(asset_path):
+                return "asset", asset_path
+
+        # "/", "/blog/tom", "/blog/tom/" and "/blog/tom.html" are all pages
+        stem = path[:-5] if path.endswith(".html") else path.rstrip("/")
+        candidates = [os.path.join(self.content_dir, "index.md")] if not stem else [
+            os.path.join(self.content_dir, f"{stem}.md"),
+            os.path.join(self.content_dir, stem, "index.md"),
+        ]
+        for candidate in candidates:
+            if candidate in self.sources:
+                return "page", candidate
+        return None
+
+    def dependencies(self, refs):
+        '''Returns ([static files], [linked page sources], [broken refs]) for a page's refs'''
+
+        assets, pages, broken = set(), set(), []
+        for url in refs:
+            if url.startswith("//"):
+                continue  # protocol-relative: another site
+            target = self.resolve(url)
+            if target is None:
+                broken.append(url)
+            elif target[0] == "asset":
+                assets.add(target[1])
+            else:
+                pages.add(target[1])
+        return sorted(assets), sorted(pages), broken
+
+def report_broken_links(broken_links):
+    '''Prints [(from_path, url)] of internal links that point at nothing'''
+
+    if broken_links:
+        print(f"!!! {len(broken_links)} broken internal link(s):")
+        for from_path, url in broken_links:
+            print(f"!!!   {from_path}: {url}")
@@ -0,0 +1,121 @@
+# src/fingerprint.py
+
+'''
+Asset fingerprinting (main.py build --fingerprint).
+
+Every static file is also published under a content-hashed name, e.g.
+static/index.css -> docs/index.1a2b3c4d.css, so it can be served with long-lived
+immutable cache headers: a changed file gets a new name instead of needing revalidation.
+The original names are still copied by copy_static/sync_static.
+
+The returned {"/index.css": "/index.1a2b3c4d.css"} map is handed to urls.set_fingerprints,
+which points href/src references in the template and generated img/a tags at the
+hashed copies. It is also written to docs/asset-manifest.json for other tooling.
+
+Hashes are computed once per build and remembered across builds in a cache keyed by
+size and mtime, so unchanged assets are never re-read.
+'''
+
+import json
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import copy_static
+import manifest
+import output_writer
+
+HASH_LENGTH = 8
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+
+def fingerprinted_path(rel_path, digest):
+    '''"images/tom.png" -> "images/tom.<first HASH_LENGTH chars of digest>.png"'''
+
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+def asset_url(rel_path):
+    '''Root-relative URL of a path relative to the static directory'''
+
+    return "/" + rel_path.replace(os.sep, "/")
+
+def publish_file(src_path, dest_path):
+    '''
+    Copies src_path to dest_path unless it is already there. The name is derived from
+    the content, so an existing file of the right size already holds these bytes.
+    '''
+
+    try:
+        if os.path.getsize(dest_path) == os.path.getsize(src_path):
+            return False
+    except OSError:
+        pass
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    copy_static.clone_file(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    return True
+
+def fingerprint_assets(src_dir, dest_dir, cache_path, workers=None):
+    '''
+    Publishes a fingerprinted copy of every file in src_dir into dest_dir, removes
+    copies that a previous build published for content that is gone, and writes the
+    asset manifest. Files are hashed and copied by a pool of workers threads.
+
+    Returns {asset URL: fingerprinted URL}.
+    '''
+
+    start = time.perf_counter()
+    old_records = manifest.load_manifest(cache_path)
+    records = {}
+    to_hash = []
+
+    for rel_path, entry in copy_static.scan_files(src_dir):
+        src_stat = entry.stat()
+        record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        old_record = old_records.get(rel_path)
+        if (old_record and old_record.get("size") == record["size"]
+                and old_record.get("mtime_ns") == record["mtime_ns"]):
+            record["hash"] = old_record["hash"]
+        else:
+            to_hash.append(rel_path)
+        records[rel_path] = record
+
+    def hash_and_publish(rel_path):
+        src_path = os.path.join(src_dir, rel_path)
+        record = records[rel_path]
+        if "hash" not in record:
+            record["hash"] = manifest.hash_file(src_path)
+        dest_path = os.path.join(dest_dir, fingerprinted_path(rel_path, record["hash"]))
+        return publish_file(src_path, dest_path)
+
+    for rel_dir in {os.path.dirname(rel_path) for rel_path in records}:
+        os.makedirs(os.path.join(dest_dir, rel_dir), exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        published = sum(executor.map(hash_and_publish, records))
+
+    fingerprints = {
+        asset_url(rel_path): asset_url(fingerprinted_path(rel_path, record["hash"]))
+        for rel_path, record in sorted(records.items())
+    }
+
+    # copies published for an older version (or a deleted file) of an asset
+    removed = 0
+    live_paths = set(fingerprints.values())
+    for rel_path, old_record in old_records.items():
+        stale_rel_path = fingerprinted_path(rel_path, old_record.get("hash", ""))
+        stale_path = os.path.join(dest_dir, stale_rel_path)
+        if asset_url(stale_rel_path) not in live_paths and os.path.isfile(stale_path):
+            os.remove(stale_path)
+            removed += 1
+
+    output_writer.OutputWriter().write(
+        os.path.join(dest_dir, ASSET_MANIFEST_NAME),
+        json.dumps(fingerprints, indent=2, sort_keys=True) + "\n")
+    manifest.save_manifest(cache_path, records)
+
+    print(f">>> Fingerprinted {len(records)} assets: {len(to_hash)} hashed, "
+          f"{published} published, {removed} removed "
+          f"({time.perf_counter() - start:.3f}s)")
+    return fingerprints
@@ -0,0 +1,37 @@
+# src/fixtures.py
+
+'''Shared test fixtures'''
+
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+
+    '''
+    A TestCase with a fresh temporary folder per test (self.root), removed afterwards.
+    Relative paths given to write/read are taken from self.root.
+    '''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    def write(self, path, data):
+        '''Writes text or bytes to path, creating its folder; returns the full path'''
+
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, bytes):
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        return path
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), encoding='utf-8') as f:
+            return f.read()
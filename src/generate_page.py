@@ -2,21 +2,126 @@
 
 '''Generates a single HTML page from markdown input'''
 
+import io
+import math
 import os
 
+import ast_cache
+import depgraph
+import images
+import manifest
 import markdown_to_node
-
-from copy_static import copy_static
+import minify
+import output_writer
+import templates
+import urls
 
 def extract_title(markdown):
     '''Extracts h1 header from markdown file and returns as title'''
     blocks = markdown_to_node.markdown_to_blocks(markdown)
     for block in blocks:
-        if block.startswith('# '):
-            return "\n".join([line.lstrip("# ") for line in block.split("\n")])
+        title = markdown_to_node.block_title(block)
+        if title is not None:
+            return title
     raise ValueError("No toplevel header found in markdown")
 
-def generate_page(basepath, from_path, template_path, dest_path):
+def stream_page(basepath, blocks, template, stream):
+    '''
+    Converts an iterable of markdown blocks to HTML and writes it, spliced into the
+    compiled template, to stream. Blocks are converted and written one at a time,
+    and the title is captured during the same pass.
+
+    Blocks are only held back until the title is found (normally the first block),
+    since the template needs it before the content.
+
+    Blocks are rendered directly to HTML (markdown_to_node.block_to_html), no node trees,
+    and minified one by one while minification is enabled.
+    '''
+
+    blocks = iter(blocks)
+    held_blocks = []
+    title = None
+    for block in blocks:
+        held_blocks.append(block)
+        title = markdown_to_node.block_title(block)
+        if title is not None:
+            break
+    if title is None:
+        raise ValueError("No toplevel header found in markdown")
+
+    minified = minify.is_enabled()
+
+    def render_block(block):
+        html = markdown_to_node.cached_block_to_html(block, basepath)
+        return minify.minify_content(html) if minified else html
+
+    for i, segment in enumerate(template):
+        if i % 2 == 0:
+            stream.write(segment)
+        elif segment == "Title":
+            stream.write(title)
+        elif segment == "Content":
+            stream.write("<div>")
+            for block in held_blocks:
+                stream.write(render_block(block))
+            for block in blocks:
+                stream.write(render_block(block))
+            stream.write("</div>")
+        else:
+            stream.write(f"{{{{ {segment} }}}}")
+
+def render_page(basepath, markdown, template):
+    '''
+    Converts markdown to HTML and returns it spliced into the template.
+    template is a compiled template (see templates.load_template) for the same basepath.
+    '''
+
+    stream = io.StringIO()
+    stream_page(basepath, markdown_to_node.markdown_to_blocks(markdown), template, stream)
+    return stream.getvalue()
+
+def write_page(dest_path, html, writer=None):
+    '''
+    Writes rendered HTML to dest_path through writer (an output_writer.OutputWriter),
+    creating destination folders as needed and skipping the write if nothing changed
+    '''
+
+    writer = writer or output_writer.OutputWriter()
+    writer.write(dest_path, html)
+
+def build_page(basepath, source, template, dest_path, writer=None):
+    '''
+    Streams the markdown in source (an open file or any iterable of lines) to an HTML
+    page at dest_path, creating destination folders as needed.
+    The page is streamed to a temporary file that only replaces dest_path if it differs.
+    '''
+
+    writer = writer or output_writer.OutputWriter()
+    with writer.open(dest_path) as f:
+        stream_page(basepath, markdown_to_node.iter_markdown_blocks(source), template, f)
+
+def build_page_file(basepath, from_path, template, dest_path, cache=None, writer=None):
+    '''
+    Generates dest_path from the markdown file at from_path.
+    With an ASTCache, pages up to ast_cache.MAX_SOURCE_BYTES reuse a cached parse;
+    anything else is streamed by build_page.
+    '''
+
+    with open(from_path, 'r', encoding='utf-8') as source:
+        if cache is None or os.path.getsize(from_path) > ast_cache.MAX_SOURCE_BYTES:
+            build_page(basepath, source, template, dest_path, writer)
+            return
+
+        title, node = cache.parse_page(source.read(), basepath)
+    if title is None:
+        raise ValueError("No toplevel header found in markdown")
+    content = node.to_html()
+    if minify.is_enabled():
+        content = minify.minify_content(content)
+    write_page(dest_path, templates.render_template(template, Title=title, Content=content),
+               writer)
+
+def generate_page(basepath, from_path, template_path, dest_path, writer=None):
     '''
     Converts markdown file at from_path to HTML and inserts into template.
     Writes adjusted template to dest_path. Creates destination folders as needed.
@@ -25,41 +130,237 @@ def generate_page(basepath, from_path, template_path, dest_path):
     print(f">>> Generating page from {from_path} to {dest_path}")
 
     try:
-        with open(from_path, 'r', encoding='utf-8') as f:
-            markdown = f.read()
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = templates.load_template(template_path, basepath)
+        source = open(from_path, 'r', encoding='utf-8')
     except Exception as e:
         print(f"!!! Error reading files: {e}")
-        return
-
-    node = markdown_to_node.markdown_to_html_node(markdown)
-    html_string = node.to_html()
-
-    title = extract_title(markdown)
+        return False
 
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html_string)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
+    with source:
+        build_page(basepath, source, template, dest_path, writer)
+    return True
 
-    dest_dir = os.path.dirname(dest_path)
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-    with open(dest_path, 'w', encoding='utf-8') as f:
-        f.write(template)
-
-def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path):
+def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path,
+                             writer=None):
     '''
-    Recursively searches content directory and generates HTML pages for any markdown file found
+    Recursively searches content directory and generates HTML pages for any markdown file found.
+    The top-level call reports how many pages were written and how many were unchanged
+    (and with minification, the bytes it saved).
     '''
 
+    if writer is None:
+        writer = output_writer.OutputWriter()
+        saved_bytes = minify.saved_bytes
+        generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path, writer)
+        output_writer.report_output(writer.written, writer.unchanged)
+        if minify.is_enabled():
+            minify.report_saved(minify.saved_bytes - saved_bytes,
+                                templates.template_bytes_saved(template_path, basepath),
+                                writer.written + writer.unchanged)
+        return
+
     for item in os.listdir(dir_path_content):
         item_path = os.path.join(dir_path_content, item)
         if os.path.isfile(item_path) and item.endswith('.md'):
             rel_path = os.path.relpath(item_path, dir_path_content)
             dest_path = os.path.join(dest_dir_path, f'{rel_path[:-3]}.html')
-            generate_page(basepath, item_path, template_path, dest_path)
+            generate_page(basepath, item_path, template_path, dest_path, writer)
         elif os.path.isdir(item_path):
             new_dest_dir = os.path.join(dest_dir_path, item)
-            generate_pages_recursive(basepath, item_path, template_path, new_dest_dir)
+            generate_pages_recursive(basepath, item_path, template_path, new_dest_dir, writer)
+
+def find_pages(dir_path_content, dest_dir_path):
+    '''
+    Returns a sorted list of (markdown path, html path) pairs for every markdown file
+    under the content directory, mirroring generate_pages_recursive's output layout
+    '''
+
+    pages = []
+    for dir_path, dir_names, file_names in os.walk(dir_path_content):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, dir_path_content)
+        for item in sorted(file_names):
+            if item.endswith('.md'):
+                dest_path = os.path.normpath(
+                    os.path.join(dest_dir_path, rel_dir, f'{item[:-3]}.html'))
+                pages.append((os.path.join(dir_path, item), dest_path))
+    return sorted(pages)
+
+def _generate_chunk(work):
+    '''
+    Process pool work unit: generates a chunk of pages without printing.
+    Returns ([(from_path, error message or None)] in chunk order,
+    [page hits, page misses, block hits, block misses, written, unchanged,
+    content bytes minified away] for this chunk).
+    '''
+
+    basepath, template_path, chunk, cache_dir, fingerprints, minified, image_settings = work
+    # workers may have been spawned rather than forked from the build process
+    urls.set_fingerprints(fingerprints)
+    minify.set_enabled(minified)
+    images.set_settings(image_settings)
+    template = templates.load_template(template_path, basepath)
+    cache = ast_cache.ASTCache(cache_dir) if cache_dir else None
+    writer = output_writer.OutputWriter()
+    # generate_pages has already created every destination folder
+    writer.dirs.update(os.path.dirname(dest_path) for _, dest_path in chunk)
+    block_hits, block_misses = markdown_to_node.block_cache_stats()
+    saved_bytes = minify.saved_bytes
+
+    results = []
+    for from_path, dest_path in chunk:
+        try:
+            build_page_file(basepath, from_path, template, dest_path, cache, writer)
+            results.append((from_path, None))
+        except Exception as e:
+            results.append((from_path, f"{type(e).__name__}: {e}"))
+
+    end_block_hits, end_block_misses = markdown_to_node.block_cache_stats()
+    stats = [cache.hits if cache else 0, cache.misses if cache else 0,
+             end_block_hits - block_hits, end_block_misses - block_misses] + writer.stats()
+    stats.append(minify.saved_bytes - saved_bytes)
+    return results, stats
+
+def generate_pages(basepath, pages, template_path, jobs=1, cache_dir=None):
+    '''
+    Generates every (markdown path, html path) pair in pages, fanned out across
+    a pool of jobs processes in chunks. Each page writes its own output file, so the
+    result is identical to a serial build.
+    Outputs whose bytes didn't change are left untouched (see output_writer).
+
+    With cache_dir, parsed pages are reused from (and saved to) an ASTCache there,
+    which is trimmed to size and reported on once the build is done.
+
+    Returns [(from_path, error message)] for pages that failed, in page order.
+    '''
+
+    if not pages:
+        return []
+
+    # every destination folder is created once, up front, instead of checked per page
+    output_writer.OutputWriter().make_dirs(
+        sorted({os.path.dirname(dest_path) for _, dest_path in pages}))
+
+    results = []
+    stats = [0, 0, 0, 0, 0, 0, 0]
+    settings = (cache_dir, urls.get_fingerprints(), minify.is_enabled(),
+                images.get_settings())
+    if jobs <= 1:
+        chunk_results = [_generate_chunk((basepath, template_path, pages) + settings)]
+    else:
+        # a few chunks per worker keeps the pool busy without per-page IPC overhead
+        chunk_size = max(1, math.ceil(len(pages) / (jobs * 4)))
+        chunks = [(basepath, template_path, pages[i:i + chunk_size]) + settings
+                  for i in range(0, len(pages), chunk_size)]
+        # imported here: the process pool machinery is slow to import and serial builds
+        # (and render-one) never need it
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunk_results = list(executor.map(_generate_chunk, chunks))
+    for page_results, chunk_stats in chunk_results:
+        results.extend(page_results)
+        stats = [total + count for total, count in zip(stats, chunk_stats)]
+
+    if cache_dir:
+        evicted = ast_cache.ASTCache(cache_dir).evict()
+        print(f">>> AST cache: {stats[0]} page hits, {stats[1]} page misses, "
+              f"{evicted} evicted; block cache: {stats[2]} hits, {stats[3]} misses")
+    output_writer.report_output(stats[4], stats[5])
+    if minify.is_enabled():
+        minify.report_saved(stats[6], templates.template_bytes_saved(template_path, basepath),
+                            stats[4] + stats[5])
+
+    return [(from_path, error) for from_path, error in results if error]
+
+def report_failures(failures):
+    '''Prints one aggregated summary of failed pages'''
+
+    if failures:
+        print(f"!!! {len(failures)} page(s) failed to generate:")
+        for from_path, error in failures:
+            print(f"!!!   {from_path}: {error}")
+
+def generate_pages_parallel(basepath, dir_path_content, template_path, dest_dir_path, jobs,
+                            cache_dir=None):
+    '''
+    Discovers every page up front, then generates them across a process pool.
+    Returns the list of failures (see generate_pages).
+    '''
+
+    pages = find_pages(dir_path_content, dest_dir_path)
+    print(f">>> Generating {len(pages)} pages with {jobs} jobs")
+    failures = generate_pages(basepath, pages, template_path, jobs, cache_dir)
+    report_failures(failures)
+    return failures
+
+def generate_pages_incremental(basepath, dir_path_content, template_path, dest_dir_path,
+                               manifest_path, jobs=1, cache_dir=None, static_dir=None):
+    '''
+    Like generate_pages_recursive, but only regenerates pages whose output would change:
+    their source, the compiled template, output path, the fingerprinted URLs of referenced
+    static assets, the attributes of the images they show, minification, or (for pages with
+    root-relative links) the basepath changed since the last build recorded in the manifest.
+    Outputs whose sources were deleted are removed.
+
+    The dependency graph (see depgraph) is updated in the same pass, and internal links
+    that point at no page or file in static_dir are reported.
+
+    Returns (generated, unchanged, removed, failures).
+    '''
+
+    old_pages = manifest.load_manifest(manifest_path)
+    template_hash = depgraph.template_hash(template_path, basepath)
+    fingerprints = urls.get_fingerprints()
+    image_attributes = images.is_enabled()
+    minified = True if minify.is_enabled() else None
+
+    pages = find_pages(dir_path_content, dest_dir_path)
+    graph = depgraph.DependencyGraph(
+        dir_path_content, static_dir, [from_path for from_path, _ in pages])
+    new_pages = {}
+    stale_pages = []
+    live_outputs = set()
+    broken_links = []
+    for from_path, dest_path in pages:
+        live_outputs.add(dest_path)
+        old_entry = old_pages.get(from_path)
+        page = depgraph.read_page(from_path, old_entry)
+        refs, page_images = page["refs"], page["images"]
+        assets, linked_pages, broken = graph.dependencies(refs)
+        broken_links.extend((from_path, url) for url in broken)
+        fingerprinted = {url: fingerprints[url] for url in refs if url in fingerprints}
+        image_settings = (images.images_key(page_images)
+                          if image_attributes and page_images else None)
+
+        entry = manifest.page_entry(
+            page["source_hash"], template_hash, basepath if refs else None, dest_path,
+            template_path, refs, assets, linked_pages, fingerprinted or None,
+            image_settings, minified, page_images, page["size"], page["mtime_ns"])
+        new_pages[from_path] = entry
+
+        if manifest.needs_rebuild(old_entry, entry) or not os.path.exists(dest_path):
+            stale_pages.append((from_path, dest_path))
+
+    failures = generate_pages(basepath, stale_pages, template_path, jobs, cache_dir)
+    report_failures(failures)
+    # failed pages stay out of the manifest so the next build retries them
+    for from_path, _ in failures:
+        del new_pages[from_path]
+
+    # outputs no longer produced by any source (deleted or moved pages)
+    removed = 0
+    for entry in old_pages.values():
+        stale_path = entry["dest_path"]
+        if stale_path not in live_outputs and os.path.isfile(stale_path):
+            print(f">>> Removing stale page {stale_path}")
+            os.remove(stale_path)
+            removed += 1
+
+    manifest.save_manifest(manifest_path, new_pages)
+
+    generated = len(stale_pages) - len(failures)
+    unchanged = len(new_pages) - generated
+    depgraph.report_broken_links(broken_links)
+    print(f">>> Incremental build: {generated} generated, "
+          f"{unchanged} unchanged, {removed} removed")
+    return generated, unchanged, removed, failures
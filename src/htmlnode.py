@@ -4,25 +4,20 @@
 
 class HTMLNode():
 
-    '''For handling of HTML'''
+    '''
+    For handling of HTML
+
+    Nodes are slotted and take ownership of the children list and props dict they are
+    given (no copies), so don't mutate those after handing them over.
+    '''
+
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
-
-        if children:
-            self.children = []
-            for child in children:
-                self.children.append(child)
-        else:
-            self.children = None
-
-        if props:
-            self.props = {}
-            for prop in props:
-                self.props[prop] = props[prop]
-        else:
-            self.props = None
+        self.children = children if children else None
+        self.props = props if props else None
 
     def __eq__(self, other):
         return (self.tag == other.tag
@@ -33,7 +28,7 @@ class HTMLNode():
     def __repr__(self):
         return f'HTMLNode({self.tag}, {self.value}, {repr(self.children)}, {str(self.props)})'
 
-    def to_html(self):
+    def to_html(self, stream=None):
         raise NotImplementedError
 
     def props_to_html(self):
@@ -56,17 +51,24 @@ class LeafNode(HTMLNode):
 
     '''For handling of HTML leaf nodes (no children)'''
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, props=props)
 
-    def to_html(self):
+    def to_html(self, stream=None):
         if self.value is None:
             raise ValueError("All leaf nodes must have a value.")
 
         if self.tag is None:
-            return self.value
+            html = self.value
+        else:
+            html = f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        if stream is None:
+            return html
+        stream.write(html)
+        return None
 
     def __eq__(self, other):
         return (self.tag == other.tag
@@ -81,20 +83,48 @@ class ParentNode(HTMLNode):
     '''Our new ParentNode class will handle the nesting of HTML nodes inside of one another.
     Any HTML node that's not "leaf" node (i.e. it has children) is a "parent" node.'''
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
-        if not self.tag:
-            raise ValueError("All parent nodes must have a tag.")
+    def to_html(self, stream=None):
+        '''
+        Serializes the whole subtree in one iterative pass (no recursion, so nesting depth
+        is not limited by the interpreter's recursion limit).
+
+        With no stream, fragments are collected in a list and joined once at the end.
+        With a stream (any object with .write, e.g. io.StringIO or an open file),
+        fragments are written straight to it and None is returned.
+        '''
+
+        fragments = []
+        write = fragments.append if stream is None else stream.write
+
+        # pending work: nodes still to serialize and closing tags still to emit
+        stack = [self]
+        while stack:
+            item = stack.pop()
+
+            if isinstance(item, str):
+                write(item)
+
+            elif isinstance(item, ParentNode):
+                if not item.tag:
+                    raise ValueError("All parent nodes must have a tag.")
+                if not item.children:
+                    raise ValueError("All parent nodes must have at least one child.")
+
+                write(f"<{item.tag}>")
+                stack.append(f"</{item.tag}>")
+                stack.extend(reversed(item.children))
 
-        if not self.children:
-            raise ValueError("All parent nodes must have at least one child.")
+            else:
+                write(item.to_html())
 
-        converted_html = f"<{self.tag}>"
-        for child in self.children:
-            converted_html += child.to_html()
-        return converted_html + f"</{self.tag}>"
+        if stream is None:
+            return "".join(fragments)
+        return None
 
     def __eq__(self, other):
         return (self.tag == other.tag
@@ -0,0 +1,208 @@
+# src/images.py
+
+'''
+Image attributes for generated <img> tags (main.py build --image-dimensions).
+
+The pixel size of every PNG, JPEG, GIF and WebP file in static/ is read from its header
+(only the first bytes of the file, no image library needed) and cached across builds by
+path, size and mtime. While enabled, generated images get
+
+    width/height        for images whose size is known, so the browser can reserve
+                        their space before they load (no layout shift)
+    loading="lazy"      images below the fold are only fetched when scrolled to
+    decoding="async"    decoding doesn't hold up the rest of the page
+
+With responsive variants (see responsive), images that have them also get srcset
+and sizes.
+
+The dimensions and variants are set once per build with set_dimensions/set_variants.
+Anything caching rendered HTML keys it by images_key() of the images it shows, so
+adding or resizing an image only invalidates the pages and blocks that show it.
+'''
+
+import os
+import struct
+import time
+
+from urls import rebase_url
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# "/images/tom.png" -> (width, height); None: width/height/loading/decoding disabled
+_dimensions = None
+# "/images/tom.png" -> [(width, URL), ...] from smallest to the original
+_variants = {}
+_sizes = ""
+
+
+def set_dimensions(dimensions):
+    '''Enables image attributes with {image URL: (width, height)}, or disables them (None)'''
+
+    global _dimensions
+    _dimensions = None if dimensions is None else {
+        url: tuple(size) for url, size in dimensions.items()}
+
+def set_variants(variants, sizes):
+    '''
+    Enables srcset/sizes for images with {image URL: [(width, URL), ...]}
+    (see responsive.build_variants); an empty mapping disables them.
+    '''
+
+    global _variants, _sizes
+    _variants = {url: [tuple(variant) for variant in widths]
+                 for url, widths in (variants or {}).items()}
+    _sizes = sizes if _variants else ""
+
+def get_settings():
+    '''The current settings, to hand to set_settings in a worker process'''
+
+    return _dimensions, _variants, _sizes
+
+def set_settings(settings):
+    dimensions, variants, sizes = settings
+    set_dimensions(dimensions)
+    set_variants(variants, sizes)
+
+def is_enabled():
+    '''True if generated images get any extra attributes'''
+
+    return _dimensions is not None or bool(_variants)
+
+def images_key(image_urls):
+    '''
+    Identifies the attributes the images at image_urls get with the current settings.
+    Only their own dimensions and variants go in, so other images can change freely.
+    '''
+
+    import hashlib
+    digest = hashlib.sha256(f"{_dimensions is not None}\0".encode('utf-8'))
+    for url in sorted(set(image_urls)):
+        size = None if _dimensions is None else _dimensions.get(url)
+        variants = _variants.get(url)
+        digest.update(f"{url}\0{size}\0{variants}\0{_sizes if variants else ''}\0"
+                      .encode('utf-8'))
+    return digest.hexdigest()
+
+def img_attributes(url, basepath="/"):
+    '''Extra attributes for an <img> with this (not yet rebased) src, in output order'''
+
+    attributes = {}
+    if _dimensions is not None:
+        size = _dimensions.get(url)
+        if size is not None:
+            attributes["width"], attributes["height"] = size
+        attributes["loading"] = "lazy"
+        attributes["decoding"] = "async"
+    variants = _variants.get(url)
+    if variants:
+        attributes["srcset"] = ", ".join(f"{rebase_url(variant_url, basepath)} {width}w"
+                                         for width, variant_url in variants)
+        attributes["sizes"] = _sizes
+    return attributes
+
+def img_attributes_html(url, basepath="/"):
+    '''img_attributes(url, basepath) as HTMLNode.props_to_html would serialize them'''
+
+    return "".join(f' {key}="{value}"'
+                   for key, value in img_attributes(url, basepath).items())
+
+# header parsing
+
+def read_dimensions(path):
+    '''Returns (width, height) of the image at path, or None if its format isn't recognized'''
+
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return webp_dimensions(head)
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return jpeg_dimensions(f)
+    return None
+
+def webp_dimensions(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":  # lossy
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b"VP8L" and head[20] == 0x2f:  # lossless
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b"VP8X":  # extended
+        return (int.from_bytes(head[24:27], 'little') + 1,
+                int.from_bytes(head[27:30], 'little') + 1)
+    return None
+
+def jpeg_dimensions(f):
+    '''Walks the JPEG segments after the SOI marker up to the frame header (SOFn)'''
+
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":  # fill bytes
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker == 0x01 or 0xd0 <= marker <= 0xd8:  # standalone markers
+            continue
+        if marker in (0xd9, 0xda):  # end of image or start of scan without a frame header
+            return None
+
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+def scan_dimensions(static_dir, cache_path):
+    '''
+    Returns {image URL: (width, height)} for the images under static_dir.
+    Headers are only read for images added or changed since the cache at cache_path
+    was written.
+    '''
+
+    # imported here, like hashlib: markdown_to_node imports this module on every startup
+    import copy_static
+    import manifest
+
+    start = time.perf_counter()
+    old_records = manifest.load_manifest(cache_path)
+    records = {}
+    dimensions = {}
+    read = 0
+
+    for rel_path, entry in copy_static.scan_files(static_dir):
+        if os.path.splitext(rel_path)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        src_stat = entry.stat()
+        record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        old_record = old_records.get(rel_path)
+        if (old_record and old_record["size"] == record["size"]
+                and old_record["mtime_ns"] == record["mtime_ns"]):
+            record["dimensions"] = old_record["dimensions"]
+        else:
+            try:
+                record["dimensions"] = read_dimensions(entry.path)
+            except (OSError, struct.error, IndexError):
+                record["dimensions"] = None
+            read += 1
+        records[rel_path] = record
+        if record["dimensions"]:
+            dimensions["/" + rel_path.replace(os.sep, "/")] = tuple(record["dimensions"])
+
+    manifest.save_manifest(cache_path, records)
+    print(f">>> Image dimensions: {len(dimensions)} of {len(records)} images known, "
+          f"{read} headers read ({time.perf_counter() - start:.3f}s)")
+    return dimensions
@@ -1,24 +1,277 @@
 # main.py
 
-'''Main site generator script'''
+'''
+Main site generator script
 
+    python3 src/main.py build [basepath] [options]   build content/ into docs/
+    python3 src/main.py serve [basepath] [options]   build, then serve docs/ with live reload
+    python3 src/main.py render-one [file]            render one markdown file (or stdin)
+    python3 src/main.py serve-render [options]       render daemon on a Unix socket
+
+With no subcommand, build is assumed (python3 src/main.py "/site-generator/").
+Pipeline modules are only imported by the subcommand that needs them, so importing
+this module or rendering a single document doesn't pay for the whole build.
+'''
+
+import argparse
+import os
 import sys
 
-from copy_static import copy_static
-from generate_page import generate_pages_recursive
+MANIFEST_PATH = ".cache/manifest.json"
+STATIC_MANIFEST_PATH = ".cache/static.json"
+AST_CACHE_DIR = ".cache/ast"
+FINGERPRINT_CACHE_PATH = ".cache/fingerprints.json"
+GZIP_CACHE_DIR = ".cache/gzip"
+IMAGE_CACHE_PATH = ".cache/images.json"
+VARIANT_CACHE_DIR = ".cache/variants"
+COMMANDS = ("build", "serve", "render-one", "serve-render")
 
-if len(sys.argv) > 1:
-    print(">>> Basepath argument provided:", sys.argv[1])
-    basepath = sys.argv[1]
-else:
-    basepath = "/"
+def build(args):
+    '''The build subcommand. Returns the exit code.'''
+
+    if args.basepath:
+        print(">>> Basepath argument provided:", args.basepath)
+        basepath = args.basepath
+    else:
+        basepath = "/"
 
-def main():
     print(">>> main.py starting")
-    copy_static("static", "docs")
-    print(">>> copy_static completed")
-    generate_pages_recursive(basepath, "content", "template.html", "docs")
+    if args.minify:
+        import minify
+        minify.set_enabled(True)
+    failures = []
+    cache_dir = AST_CACHE_DIR if args.cache else None
+    if args.incremental:
+        from copy_static import sync_static
+        from generate_page import generate_pages_incremental
+        sync_static("static", "docs", STATIC_MANIFEST_PATH,
+                    args.hash_assets, args.hardlink_assets, args.copy_workers)
+        print(">>> sync_static completed")
+        process_assets(args)
+        failures = generate_pages_incremental(
+            basepath, "content", "template.html", "docs", MANIFEST_PATH, args.jobs, cache_dir,
+            "static")[3]
+    else:
+        from copy_static import copy_static
+        from generate_page import find_pages
+        # clearing docs/ spares the pages about to be regenerated, so the ones whose
+        # bytes don't change aren't rewritten (see output_writer)
+        pages = [os.path.relpath(dest_path, "docs")
+                 for _, dest_path in find_pages("content", "docs")]
+        copy_static("static", "docs", workers=args.copy_workers, keep=pages)
+        print(">>> copy_static completed")
+        process_assets(args)
+        if args.profile or args.profile_dump:
+            import profiler
+            failures = profiler.profile_build(basepath, "content", "template.html", "docs",
+                                              dump_path=args.profile_dump)
+        elif args.jobs > 1 or cache_dir:
+            from generate_page import generate_pages_parallel
+            failures = generate_pages_parallel(
+                basepath, "content", "template.html", "docs", args.jobs, cache_dir)
+        else:
+            from generate_page import generate_pages_recursive
+            generate_pages_recursive(basepath, "content", "template.html", "docs")
     print(">>> generate_page completed")
+
+    if args.gzip:
+        import precompress
+        precompress.precompress_tree("docs", GZIP_CACHE_DIR, args.copy_workers)
+
+    if args.watch:
+        import urls
+        import watch
+        # watch mode recopies changed assets under their own names only
+        urls.set_fingerprints(None)
+        watch.watch(basepath, "content", "static", "template.html", "docs", args.port)
+
     print(">>> main.py finished")
+    return 1 if failures else 0
+
+def process_assets(args):
+    '''
+    Per-build asset processing, once static/ is in place: with --fingerprint, publishes
+    hashed copies of static/ and rewrites URLs to them; with --image-dimensions, reads
+    image sizes for the img attributes; with --responsive-widths, publishes downscaled
+    variants of the content's images for srcset (incremental builds find those images
+    through the manifest, so unchanged pages aren't read again).
+    '''
+
+    if args.fingerprint:
+        import fingerprint
+        import urls
+        urls.set_fingerprints(fingerprint.fingerprint_assets(
+            "static", "docs", FINGERPRINT_CACHE_PATH, args.copy_workers))
+    if args.image_dimensions:
+        import images
+        images.set_dimensions(images.scan_dimensions("static", IMAGE_CACHE_PATH))
+    if args.responsive_widths:
+        import images
+        import manifest
+        import responsive
+        old_pages = manifest.load_manifest(MANIFEST_PATH) if args.incremental else None
+        variants = responsive.build_variants("content", "static", "docs", VARIANT_CACHE_DIR,
+                                             args.responsive_widths, args.jobs, old_pages)
+        images.set_variants(variants, args.image_sizes or responsive.DEFAULT_SIZES)
+
+def serve(args):
+    '''The serve subcommand: a build followed by watch mode'''
+
+    args.watch = True
+    return build(args)
+
+def render_one(args):
+    '''
+    The render-one subcommand: renders a single markdown document to stdout,
+    as a full page in the template or, with --fragment, just the content HTML.
+    '''
+
+    if args.file == "-":
+        markdown = sys.stdin.read()
+    else:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            markdown = f.read()
+
+    try:
+        if args.fragment:
+            import markdown_to_node
+            html = markdown_to_node.markdown_to_html(markdown, args.basepath)
+        else:
+            import generate_page
+            import templates
+            template = templates.load_template(args.template, args.basepath)
+            html = generate_page.render_page(args.basepath, markdown, template)
+    except ValueError as e:
+        print(f"!!! {args.file}: {e}", file=sys.stderr)
+        return 1
+
+    sys.stdout.write(html)
+    return 0
+
+def serve_render(args):
+    '''The serve-render subcommand: a warm render daemon (see render_server)'''
+
+    import render_server
+    try:
+        render_server.serve_render(args.socket, args.template, args.basepath, args.workers)
+    except FileExistsError as e:
+        print(f"!!! {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def image_widths(text):
+    '''argparse type for --responsive-widths'''
+
+    import responsive
+    return responsive.parse_widths(text)
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        description="Builds the site from content/ into docs/",
+        epilog="With no subcommand, build is assumed.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # options shared by build and serve
+    build_options = argparse.ArgumentParser(add_help=False)
+    build_options.add_argument("basepath", nargs="?", default=None)
+    build_options.add_argument("--incremental", action="store_true",
+                               help="only regenerate pages whose inputs changed "
+                                    "since the last build")
+    build_options.add_argument("--hash-assets", action="store_true",
+                               help="with --incremental, compare static files by content hash")
+    build_options.add_argument("--hardlink-assets", action="store_true",
+                               help="with --incremental, hardlink static files into docs/ "
+                                    "instead of copying them")
+    build_options.add_argument("--copy-workers", type=int, default=None,
+                               help="number of threads copying static files "
+                                    "(default: cpu count + 4)")
+    build_options.add_argument("--fingerprint", action="store_true",
+                               help="also publish static files under content-hashed names "
+                                    "and point the site's references at those")
+    build_options.add_argument("--gzip", action="store_true",
+                               help="write a maximum-level name.gz next to every compressible "
+                                    "file in docs/")
+    build_options.add_argument("--image-dimensions", action="store_true",
+                               help="give generated images width/height read from the files "
+                                    "in static/, loading=\"lazy\" and decoding=\"async\"")
+    build_options.add_argument("--responsive-widths", metavar="W,W,...", default=None,
+                               type=image_widths,
+                               help="publish downscaled copies of the content's PNG images at "
+                                    "these widths and list them in srcset")
+    build_options.add_argument("--image-sizes", metavar="SIZES", default=None,
+                               help="sizes attribute for images with --responsive-widths "
+                                    "(default: the 800px content column)")
+    build_options.add_argument("--minify", action="store_true",
+                               help="collapse insignificant whitespace in the template and "
+                                    "generated pages")
+    build_options.add_argument("--port", type=int, default=8888,
+                               help="port to serve on with live reload")
+    build_options.add_argument("-j", "--jobs", type=int, default=1,
+                               help="number of worker processes used to generate pages")
+    build_options.add_argument("--cache", action="store_true",
+                               help=f"reuse parsed pages across builds (stored in {AST_CACHE_DIR})")
+    build_options.add_argument("--profile", action="store_true",
+                               help="build serially, timing each page stage and tracking "
+                                    "allocations, and print a report")
+    build_options.add_argument("--profile-dump", metavar="PATH", default=None,
+                               help="like --profile, also saving cProfile stats to PATH")
+
+    build_parser = subparsers.add_parser("build", parents=[build_options],
+                                         help="build content/ into docs/")
+    build_parser.add_argument("--watch", action="store_true",
+                              help="after building, serve docs/ with live reload "
+                                   "and rebuild on change")
+    build_parser.set_defaults(func=build)
+
+    serve_parser = subparsers.add_parser("serve", parents=[build_options],
+                                         help="build, then serve docs/ with live reload "
+                                              "and rebuild on change")
+    serve_parser.set_defaults(func=serve)
+
+    render_parser = subparsers.add_parser("render-one",
+                                          help="render one markdown document to stdout")
+    render_parser.add_argument("file", nargs="?", default="-",
+                               help="markdown file to render (default: stdin)")
+    render_parser.add_argument("--basepath", default="/")
+    render_parser.add_argument("--template", default="template.html",
+                               help="page template (default: template.html)")
+    render_parser.add_argument("--fragment", action="store_true",
+                               help="print only the content HTML, without the template")
+    render_parser.set_defaults(func=render_one)
+
+    daemon_parser = subparsers.add_parser("serve-render",
+                                          help="render markdown on request over a Unix socket")
+    daemon_parser.add_argument("--socket", default=".cache/render.sock",
+                               help="socket path (default: .cache/render.sock)")
+    daemon_parser.add_argument("--basepath", default="/")
+    daemon_parser.add_argument("--template", default="template.html",
+                               help="page template (default: template.html)")
+    daemon_parser.add_argument("--workers", type=int, default=4,
+                               help="number of render worker threads")
+    daemon_parser.set_defaults(func=serve_render)
+
+    return parser
+
+def main(argv=None):
+    '''Parses argv (default: sys.argv[1:]) and runs the subcommand. Returns the exit code.'''
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # the old interface, main.py [basepath] [options], still means build
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "build")
+
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "profile", False) or getattr(args, "profile_dump", None):
+        # profiling times every stage of every page, so the build must be serial and
+        # from scratch; anything else would silently profile less than it claims
+        conflicts = [flag for flag, used in (("--incremental", args.incremental),
+                                             ("--jobs", args.jobs > 1),
+                                             ("--cache", args.cache)) if used]
+        if conflicts:
+            parser.error(f"--profile can't be combined with {', '.join(conflicts)}")
+    return args.func(args)
 
-main()
+# guarded so process pool workers can re-import this module without starting a build
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# src/manifest.py
+
+'''
+Persistent build manifest for incremental page generation.
+
+The manifest maps each markdown source path to the inputs its HTML output was built from
+(source hash, template hash, basepath, output path, referenced assets; see depgraph).
+A page only needs regenerating when one of those inputs has changed or its output file
+has gone missing.
+
+copy_static.sync_static keeps its record of synced static files in the same format.
+'''
+
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 2
+
+# page entry fields that affect the generated HTML (the rest is dependency bookkeeping)
+OUTPUT_INPUTS = ("source_hash", "template_hash", "basepath", "dest_path", "fingerprinted",
+                 "image_settings", "minified")
+
+
+def hash_file(path):
+    '''Returns the sha256 hex digest of a file's contents'''
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def page_entry(source_hash, template_hash, basepath, dest_path, template=None, refs=(),
+               assets=(), pages=(), fingerprinted=None, image_settings=None,
+               minified=None, images=(), size=None, mtime_ns=None):
+    '''
+    Builds the manifest record for a single page.
+    fingerprinted is {ref: fingerprinted URL} for refs rendered as fingerprinted copies;
+    image_settings is images.images_key(images) when img attributes are enabled;
+    minified is True for pages built with minification;
+    size and mtime_ns are the source's, to skip reading it while they are unchanged.
+    '''
+
+    return {
+        "source_hash": source_hash,
+        "template_hash": template_hash,
+        "basepath": basepath,
+        "dest_path": dest_path,
+        "template": template,
+        "refs": list(refs),
+        "assets": list(assets),
+        "pages": list(pages),
+        "fingerprinted": fingerprinted,
+        "image_settings": image_settings,
+        "minified": minified,
+        "images": list(images),
+        "size": size,
+        "mtime_ns": mtime_ns,
+    }
+
+def needs_rebuild(old_entry, entry):
+    '''True if entry differs from old_entry (None for a new page) in any OUTPUT_INPUTS field'''
+
+    return old_entry is None or any(
+        old_entry.get(field) != entry.get(field) for field in OUTPUT_INPUTS)
+
+def load_manifest(path):
+    '''
+    Returns {source path: page entry} from the manifest at path.
+    A missing, unreadable or out-of-date manifest is treated as empty (full rebuild).
+    '''
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("pages", {})
+
+def save_manifest(path, pages):
+    '''Writes the manifest atomically so an interrupted build never leaves it half-written'''
+
+    manifest_dir = os.path.dirname(path)
+    if manifest_dir:
+        # exist_ok: another process may create the folder between a check and makedirs
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "pages": pages}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -4,16 +4,36 @@
 Functions pertaining to HTMLNode creation and markdown-to-HTML conversion
 '''
 
+import functools
 import re
 
+import images
 from blocktype import BlockType
 from htmlnode import LeafNode, ParentNode
 from textnode import TextNode, TextType
+from urls import fingerprints_key, rebase_url
 
 from dictionaries import inline_dict, block_dict
 
+# bump whenever a parser change alters output, to invalidate cached parses (see ast_cache)
+PARSER_VERSION = 1
 
-def text_node_to_html_node(text_node):
+# blocks longer than this skip the in-memory block cache
+CACHED_BLOCK_MAX_CHARS = 4096
+
+IMAGE_RE = re.compile(r"\!\[(.*?)\]\((.*?)\)")
+LINK_RE = re.compile(r"(?<!\!)\[(.*?)\]\((.*?)\)")
+DELIMITER_RE = re.compile(r"`|\*\*|_")
+HEADING_RE = re.compile(r"#{1,6} ")
+ORDERED_ITEM_RE = re.compile(r"(\d+)\. ")
+DELIMITER_TYPES = {
+    "`": TextType.CODE,
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+}
+
+
+def text_node_to_html_node(text_node, basepath="/"):
     '''
     leaf_node.value = text_node.text
     leaf_node.tag = text_node.text_type
@@ -25,6 +45,9 @@ def text_node_to_html_node(text_node):
         - Images: text_node.url and text_node.text
         - Links: text_node.url
         None for all other types
+
+    Root-relative image/link URLs are rebased onto basepath here,
+    so the rendered page never needs a rewrite pass.
     '''
 
     try:
@@ -34,12 +57,13 @@ def text_node_to_html_node(text_node):
 
     if text_node.text_type.name == "IMAGE":
         value = ""
-        props = {"src": f"{text_node.url}",
-                    "alt": f"{text_node.text}"}
+        props = {"src": rebase_url(text_node.url, basepath),
+                    "alt": f"{text_node.text}",
+                    **images.img_attributes(text_node.url, basepath)}
 
     elif text_node.text_type.name == "LINK":
         value = text_node.text
-        props = {"href": f"{text_node.url}"}
+        props = {"href": rebase_url(text_node.url, basepath)}
 
     else:
         value = text_node.text
@@ -92,70 +116,115 @@ def extract_markdown_images(text):
     Each tuple should contain the alt text and the URL of any markdown images.
     '''
 
-    return re.findall(r"\!\[(.*?)\]\((.*?)\)", text)
+    return IMAGE_RE.findall(text)
+
+def image_settings_key(text):
+    '''
+    images.images_key for the images in markdown text, or "" if it shows none or
+    image attributes are off: text without images renders the same either way
+    '''
+
+    if "![" not in text or not images.is_enabled():
+        return ""
+    return images.images_key(url for _, url in IMAGE_RE.findall(text))
 
 def extract_markdown_links(text):
     '''Like extract_markdown_images, but with links.'''
 
-    return re.findall(r"(?<!\!)\[(.*?)\]\((.*?)\)", text)
+    return LINK_RE.findall(text)
 
-def split_nodes_image(old_nodes):
-    '''Same as split_nodes_delimiter but for images.'''
+def split_nodes_pattern(old_nodes, pattern, text_type):
+    '''
+    Shared splitter for images and links.
+    Walks the pattern's matches in order, so each (text, url) pair is taken from its own
+    match instead of being looked up again by alt text.
+    '''
 
     if not old_nodes:
         return []
     new_nodes = []
 
     for node in old_nodes:
-        converted_nodes = []
-
         if node.text_type.name != "TEXT":
             new_nodes.append(node)
+            continue
 
-        else:
-            image_pairs = extract_markdown_images(node.text)
-            converted_text = re.split(r"\!\[(.*?)\]\(.*?\)", node.text)
-            # URLs are not included in converted_text
+        position = 0
+        for match in pattern.finditer(node.text):
+            if match.start() > position:
+                new_nodes.append(TextNode(node.text[position:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            position = match.end()
+        if position < len(node.text):
+            new_nodes.append(TextNode(node.text[position:], TextType.TEXT))
 
-            for phrase in converted_text:
-                if any(phrase in pair for pair in image_pairs):
-                    url = next(u for (a, u) in image_pairs if a == phrase)
-                    converted_nodes.append(TextNode(phrase, TextType.IMAGE, url))
-                elif phrase != "":
-                    converted_nodes.append(TextNode(phrase, TextType.TEXT))
+    return new_nodes
 
-            new_nodes.extend(converted_nodes)
+def split_nodes_image(old_nodes):
+    '''Same as split_nodes_delimiter but for images.'''
 
-    return new_nodes
+    return split_nodes_pattern(old_nodes, IMAGE_RE, TextType.IMAGE)
 
 def split_nodes_link(old_nodes):
     '''Splits nodes for links.'''
 
-    if not old_nodes:
-        return []
-    new_nodes = []
+    return split_nodes_pattern(old_nodes, LINK_RE, TextType.LINK)
 
-    for node in old_nodes:
-        converted_nodes = []
+def split_delimiters(text, start, end, tokens):
+    '''
+    Inline lexer helper: appends (text_type, text, url) tokens for text[start:end],
+    which has no images or links, to tokens.
 
-        if node.text_type.name != "TEXT":
-            new_nodes.append(node)
+    Delimiters are matched leftmost first and closed by the next occurrence of the same
+    delimiter, so `code`, **bold** and _italic_ never cross each other.
+    '''
 
-        else:
-            link_pairs = extract_markdown_links(node.text)
-            converted_text = re.split(r"(?<!\!)\[(.*?)\]\(.*?\)", node.text)
-            # URLs are not included in converted_text
+    position = start
+    while True:
+        opener = DELIMITER_RE.search(text, position, end)
+        if opener is None:
+            break
 
-            for phrase in converted_text:
-                if any(phrase in pair for pair in link_pairs):
-                    url = next(u for (a, u) in link_pairs if a == phrase)
-                    converted_nodes.append(TextNode(phrase, TextType.LINK, url))
-                elif phrase != "":
-                    converted_nodes.append(TextNode(phrase, TextType.TEXT))
+        delimiter = opener.group()
+        closer = text.find(delimiter, opener.end(), end)
+        if closer == -1:
+            raise ValueError("Invalid Markdown syntax. Odd number of delimiters found")
 
-            new_nodes.extend(converted_nodes)
+        if opener.start() > position:
+            tokens.append((TextType.TEXT, text[position:opener.start()], None))
+        tokens.append((DELIMITER_TYPES[delimiter], text[opener.end():closer], None))
+        position = closer + len(delimiter)
 
-    return new_nodes
+    if position < end:
+        tokens.append((TextType.TEXT, text[position:end], None))
+
+def split_links(text, start, end, tokens):
+    '''Inline lexer helper: appends tokens for text[start:end], which has no images'''
+
+    position = start
+    for link in LINK_RE.finditer(text, start, end):
+        split_delimiters(text, position, link.start(), tokens)
+        tokens.append((TextType.LINK, link.group(1), link.group(2)))
+        position = link.end()
+    split_delimiters(text, position, end, tokens)
+
+def inline_tokens(text):
+    '''
+    The inline lexer: returns a list of (text_type, text, url) tuples, one per
+    TextNode that text_to_text_nodes would build (url is None except for links and images).
+    '''
+
+    # single pass, same precedence as the old chained splits:
+    # images outrank links, links outrank delimiters
+    tokens = []
+    position = 0
+    for image in IMAGE_RE.finditer(text):
+        split_links(text, position, image.start(), tokens)
+        tokens.append((TextType.IMAGE, image.group(1), image.group(2)))
+        position = image.end()
+    split_links(text, position, len(text), tokens)
+
+    return tokens
 
 def text_to_text_nodes(text):
     '''
@@ -183,15 +252,7 @@ def text_to_text_nodes(text):
     if not text:
         return []
 
-    old_node = [TextNode(text, TextType.TEXT)]
-
-    new_nodes = split_nodes_image(old_node)
-    new_nodes = split_nodes_link(new_nodes)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", TextType.ITALIC)
-
-    return new_nodes
+    return [TextNode(value, text_type, url) for text_type, value, url in inline_tokens(text)]
 
 def markdown_to_blocks(markdown):
     '''
@@ -229,65 +290,126 @@ def markdown_to_blocks(markdown):
 
     return blocks
 
-def block_to_block_type(text):
+def iter_markdown_blocks(lines):
+    '''
+    Streaming markdown_to_blocks: takes an iterable of lines (e.g. an open file)
+    and lazily yields exactly the blocks markdown_to_blocks would return for their
+    concatenation, without ever holding the whole document in memory.
+    '''
+
+    started = False         # leading whitespace of the document has been skipped
+    after_separator = False # the previous line's newline was eaten by a "\n\n" separator
+    block = []
+    # blocks that can't be yielded until we know they aren't trailing whitespace,
+    # which markdown_to_blocks strips off the end of the document
+    pending = []
+
+    for line in lines:
+        if not started:
+            line = line.lstrip()
+            if not line:
+                continue
+            started = True
+
+        elif line == "\n" and not after_separator:
+            text = "".join(block)[:-1]
+            block = []
+            after_separator = True
+            if text.strip():
+                yield from (pending_block for pending_block in pending if pending_block)
+                pending = [text]
+            else:
+                pending.append(text)
+            continue
+
+        block.append(line)
+        after_separator = False
+
+    tail = "\n\n".join(pending + ["".join(block)]).rstrip()
+    yield from (tail_block for tail_block in tail.split("\n\n") if tail_block)
+
+def classify_block(text):
     '''
     Takes a single block of markdown text as input.
-    Returns the BlockType representing the type of block it is.
+    Returns (BlockType, lines), where for quotes and lists lines are the block's lines
+    with their quote/list markers already stripped, and None for every other type.
+
+    Lines are split and scanned once: the first line decides which kind of block it
+    could be, the rest only have to confirm it.
     '''
 
-    if re.match(r"^#{1,6} ", text):
-        return BlockType.HEADING
+    if HEADING_RE.match(text):
+        return BlockType.HEADING, None
 
     if text.startswith("```\n") and text.endswith("```"):
-        return BlockType.CODE
+        return BlockType.CODE, None
 
     lines = text.split("\n")
-    is_quote = all(line.startswith(">") for line in lines)
-    if is_quote:
-        return BlockType.QUOTE
+    first_line = lines[0]
+    if first_line.startswith(">"):
+        stripped = []
+        for line in lines:
+            if not line.startswith(">"):
+                return BlockType.PARAGRAPH, None
+            stripped.append(line[1:].lstrip(" "))
+        return BlockType.QUOTE, stripped
+
+    if first_line.startswith("- "):
+        stripped = []
+        for line in lines:
+            if not line.startswith("- "):
+                return BlockType.PARAGRAPH, None
+            stripped.append(line[2:])
+        return BlockType.UNORDERED_LIST, stripped
+
+    if ORDERED_ITEM_RE.match(first_line):
+        stripped = []
+        # numbering has to count up from 1
+        for index, line in enumerate(lines, start=1):
+            matches = ORDERED_ITEM_RE.match(line)
+            if not matches or int(matches.group(1)) != index:
+                return BlockType.PARAGRAPH, None
+            stripped.append(line[matches.end():])
+        return BlockType.ORDERED_LIST, stripped
+
+    return BlockType.PARAGRAPH, None
 
-    is_unordered_list = all(line.startswith("- ") for line in lines)
-    if is_unordered_list:
-        return BlockType.UNORDERED_LIST
-
-    # walrus operator is cool, it lets you assign a variable within an expression
-    is_ordered_list = all(
-        (matches := re.match(r'^(\d+)\. ', line)) and int(matches.group(1)) == index
-        for index, line in enumerate(lines, start=1)
-        )
-    if is_ordered_list:
-        return BlockType.ORDERED_LIST
+def block_to_block_type(text):
+    '''
+    Takes a single block of markdown text as input.
+    Returns the BlockType representing the type of block it is.
+    '''
 
-    return BlockType.PARAGRAPH
+    return classify_block(text)[0]
 
 
 # markdown_to_html_node helper functions
-def make_children(nodes):
+def make_children(nodes, basepath="/"):
     '''Takes a list of TextNodes, returns a list of LeafNodes'''
 
     children = []
     for node in nodes:
-        leaf = text_node_to_html_node(node)
+        leaf = text_node_to_html_node(node, basepath)
         children.append(leaf)
     return children
 
-def text_to_children(text):
+def text_to_children(text, basepath="/"):
     '''
     Returns a list of LeafNodes that represent the inline markdown.
     Works for all types. Assumes removal of block syntax.
     '''
 
     nodes = text_to_text_nodes(text)
-    return make_children(nodes)
+    return make_children(nodes, basepath)
 
-def convert_heading(text):
+def convert_heading(text, basepath="/"):
     '''Returns list of child nodes with a level-specific tag'''
 
     lines = text.split("\n")
     new_lines = [line.lstrip("#").lstrip() for line in lines]
     text = "\n".join(new_lines)
     nodes = text_to_text_nodes(text)
-    children = make_children(nodes)
+    children = make_children(nodes, basepath)
 
     # length diff is number of hashes + 1
     level = str(len(lines[0]) - len(new_lines[0]) - 1)
@@ -304,22 +426,24 @@ def convert_codeblock(text):
     new_text = re.sub(r"^```\n|```$", "", text.strip())
     return [text_node_to_html_node(TextNode(text=new_text, text_type=TextType.CODE))]
 
-def convert_quote(text):
+def convert_quote(text, basepath="/", lines=None):
     '''
     This is a simplified version of the hashed-out function at the bottom of the script,
     which I could not quite make work after hours of trying.
     I might come back to it.
     It's probably totally unnecessary anyway, but I wanted nested quotes :(
 
+    lines are the block's lines without their ">" markers, if already split (see classify_block).
     Returns list of children.
     '''
 
-    lines = [line.removeprefix(">").lstrip(" ") for line in text.split("\n")]
+    if lines is None:
+        lines = [line.removeprefix(">").lstrip(" ") for line in text.split("\n")]
     text = "\n".join(lines)
     nodes = text_to_text_nodes(text)
-    return make_children(nodes)
+    return make_children(nodes, basepath)
 
-def convert_list(text, tag):
+def convert_list(text, tag, basepath="/", item_list=None):
     '''
     - This is the first list item in a list block
     - This is a list item
@@ -334,64 +458,215 @@ def convert_list(text, tag):
         <li>This is a list item</li>
         <li>This is another list item</li>
     </ul> OR <ol>
+
+    item_list is the items without their list markers, if already split (see classify_block).
     '''
 
     children = []
 
-    if tag == "ul":
+    if item_list is None and tag == "ul":
         item_list = [line.removeprefix("- ") for line in text.split("\n")]
-    else:  # "ol"
+    elif item_list is None:  # "ol"
         item_list = [re.sub("^\\d+\\. ", "", line) for line in text.split("\n")]
 
     for item in item_list:
-        item_children = text_to_children(item)
+        item_children = text_to_children(item, basepath)
         children.append(ParentNode(tag="li", children=item_children))
 
     return children
 
-def block_to_node(block):
+# BlockType -> function(block, lines, basepath) returning (tag, children)
+BLOCK_CONVERTERS = {
+    BlockType.HEADING: lambda block, lines, basepath: convert_heading(block, basepath),
+    BlockType.CODE: lambda block, lines, basepath: (
+        block_dict["CODE"], convert_codeblock(block)),
+    BlockType.QUOTE: lambda block, lines, basepath: (
+        block_dict["QUOTE"], convert_quote(block, basepath, lines)),
+    BlockType.UNORDERED_LIST: lambda block, lines, basepath: (
+        block_dict["UNORDERED_LIST"], convert_list(block, "ul", basepath, lines)),
+    BlockType.ORDERED_LIST: lambda block, lines, basepath: (
+        block_dict["ORDERED_LIST"], convert_list(block, "ol", basepath, lines)),
+    BlockType.PARAGRAPH: lambda block, lines, basepath: (
+        block_dict["PARAGRAPH"], text_to_children(block, basepath)),
+}
+
+def block_to_node(block, basepath="/", classified=None):
     '''
     Basically a markdown conversion router.
-    Calls type-specific functions as needed.
+    Classifies the block and hands it (and its pre-split lines) to the matching converter.
     Returns ParentNode with the appropriate tag and children.
+    classified can be passed in if the caller already has classify_block's result.
     '''
 
-    block_type = block_to_block_type(block)
-    tag = block_dict[block_type.name]
-
-    if block_type.name == "HEADING":
-        tag, b_children = convert_heading(block) # level-specific tag
-    elif block_type.name == "CODE":
-        b_children = convert_codeblock(block)
-    elif block_type.name == "QUOTE":
-        b_children = convert_quote(block)
-    elif block_type.name in ("ORDERED_LIST", "UNORDERED_LIST"):
-        b_children = convert_list(block, tag)
-    else: # paragraph
-        b_children = text_to_children(block)
-
+    block_type, lines = classified or classify_block(block)
+    tag, b_children = BLOCK_CONVERTERS[block_type](block, lines, basepath)
     return ParentNode(tag=tag, children=b_children)
 
 # markdown_to_html_node
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, basepath="/"):
     '''
     Converts a full markdown document into a single parent HTMLNode.
     
     That one parent HTMLNode should contain many child HTMLNode objects
     representing all nested elements.
+
+    Root-relative link and image URLs are rebased onto basepath.
     '''
     div_children = []
 
     blocks = markdown_to_blocks(markdown)
 
     for block in blocks:
-        block_node = block_to_node(block)
+        block_node = block_to_node(block, basepath)
         div_children.append(block_node)
 
     div_parent = ParentNode(tag="div", children=div_children)
 
     return div_parent
 
+# the fingerprints and the settings of the block's own images are part of the cache key:
+# the same block renders other asset URLs or img attributes once they are switched on
+# (see urls, images)
+@functools.lru_cache(maxsize=4096)
+def _cached_block_node(block, basepath, fingerprints, image_settings):
+    return block_to_node(block, basepath)
+
+def cached_block_to_node(block, basepath="/"):
+    '''
+    block_to_node behind a per-process LRU, for boilerplate blocks (footers, disclaimers,
+    reused snippets) that repeat across pages. The returned node may be shared between
+    trees, so it must not be mutated.
+    '''
+
+    if len(block) > CACHED_BLOCK_MAX_CHARS:
+        return block_to_node(block, basepath)
+    return _cached_block_node(block, basepath, fingerprints_key(),
+                              image_settings_key(block))
+
+def block_cache_stats():
+    '''Returns (hits, misses) of the block caches (nodes and HTML) in this process'''
+
+    node_info = _cached_block_node.cache_info()
+    html_info = _cached_block_html.cache_info()
+    return node_info.hits + html_info.hits, node_info.misses + html_info.misses
+
+def clear_block_caches():
+    '''Empties the block caches (nodes and HTML) of this process'''
+
+    _cached_block_node.cache_clear()
+    _cached_block_html.cache_clear()
+
+def block_title(block):
+    '''Returns the title if block is an h1 header, else None'''
+    if block.startswith('# '):
+        return "\n".join([line.lstrip("# ") for line in block.split("\n")])
+    return None
+
+def markdown_to_page(markdown, basepath="/"):
+    '''
+    Like markdown_to_html_node, but also captures the page title (first h1 block)
+    in the same pass. Returns (title or None, div node).
+    Blocks go through cached_block_to_node, so subtrees may be shared.
+    '''
+
+    title = None
+    div_children = []
+    for block in markdown_to_blocks(markdown):
+        if title is None:
+            title = block_title(block)
+        div_children.append(cached_block_to_node(block, basepath))
+
+    return title, ParentNode(tag="div", children=div_children)
+
+
+# direct rendering: the same HTML as building the node tree and calling to_html,
+# but emitted straight from the lexer tokens without creating any nodes
+INLINE_TAGS = {
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.CODE: "code",
+}
+
+def text_to_html(text, basepath="/"):
+    '''Inline markdown to HTML; same output as serializing text_to_children(text, basepath)'''
+
+    html = []
+    for text_type, value, url in inline_tokens(text):
+        if text_type is TextType.TEXT:
+            html.append(value)
+        elif text_type is TextType.LINK:
+            html.append(f'<a href="{rebase_url(url, basepath)}">{value}</a>')
+        elif text_type is TextType.IMAGE:
+            html.append(f'<img src="{rebase_url(url, basepath)}" alt="{value}"'
+                        f'{images.img_attributes_html(url, basepath)}></img>')
+        else:
+            tag = INLINE_TAGS[text_type]
+            html.append(f"<{tag}>{value}</{tag}>")
+
+    if not html:
+        # where the tree path would have an empty ParentNode
+        raise ValueError("All parent nodes must have at least one child.")
+    return "".join(html)
+
+def heading_to_html(block, basepath="/"):
+    lines = block.split("\n")
+    new_lines = [line.lstrip("#").lstrip() for line in lines]
+    # same level arithmetic as convert_heading
+    level = len(lines[0]) - len(new_lines[0]) - 1
+    inner = text_to_html("\n".join(new_lines), basepath)
+    return f"<h{level}>{inner}</h{level}>"
+
+def quote_to_html(lines, basepath="/"):
+    inner = text_to_html("\n".join(lines), basepath)
+    return f"<blockquote>{inner}</blockquote>"
+
+def list_to_html(tag, items, basepath="/"):
+    html = [f"<{tag}>"]
+    for item in items:
+        html.append(f"<li>{text_to_html(item, basepath)}</li>")
+    html.append(f"</{tag}>")
+    return "".join(html)
+
+# BlockType -> function(block, lines, basepath) returning the block's HTML
+BLOCK_RENDERERS = {
+    BlockType.HEADING: lambda block, lines, basepath: heading_to_html(block, basepath),
+    BlockType.CODE: lambda block, lines, basepath: (
+        f"<pre>{convert_codeblock(block)[0].to_html()}</pre>"),
+    BlockType.QUOTE: lambda block, lines, basepath: quote_to_html(lines, basepath),
+    BlockType.UNORDERED_LIST: lambda block, lines, basepath: list_to_html("ul", lines, basepath),
+    BlockType.ORDERED_LIST: lambda block, lines, basepath: list_to_html("ol", lines, basepath),
+    BlockType.PARAGRAPH: lambda block, lines, basepath: f"<p>{text_to_html(block, basepath)}</p>",
+}
+
+def block_to_html(block, basepath="/"):
+    '''block_to_node(block, basepath).to_html(), without building the node tree'''
+
+    block_type, lines = classify_block(block)
+    return BLOCK_RENDERERS[block_type](block, lines, basepath)
+
+@functools.lru_cache(maxsize=4096)
+def _cached_block_html(block, basepath, fingerprints, image_settings):
+    return block_to_html(block, basepath)
+
+def cached_block_to_html(block, basepath="/"):
+    '''block_to_html behind a per-process LRU, like cached_block_to_node'''
+
+    if len(block) > CACHED_BLOCK_MAX_CHARS:
+        return block_to_html(block, basepath)
+    return _cached_block_html(block, basepath, fingerprints_key(),
+                              image_settings_key(block))
+
+def markdown_to_html(markdown, basepath="/"):
+    '''
+    markdown_to_html_node(markdown, basepath).to_html() in one pass, without building
+    the node tree. Use markdown_to_html_node when the tree itself is needed.
+    '''
+
+    blocks = markdown_to_blocks(markdown)
+    if not blocks:
+        raise ValueError("All parent nodes must have at least one child.")
+    return f"<div>{''.join(block_to_html(block, basepath) for block in blocks)}</div>"
+
 
 
 
@@ -0,0 +1,86 @@
+# src/minify.py
+
+'''
+Optional HTML minification (main.py build --minify).
+
+Runs of HTML whitespace are collapsed to a single space, and whitespace next to
+block-level tags (where browsers ignore it) is dropped. The contents of pre, code,
+textarea, script and style elements are left exactly as they are, so code blocks from
+convert_codeblock keep their formatting, and so are quoted attribute values (alt and
+title text is shown to readers). Non-breaking spaces are not HTML whitespace and are
+never touched.
+
+The template is minified once, when it is compiled (see templates.load_template);
+generated content is minified block by block as pages are written. Both are enabled
+per build with set_enabled, and the bytes saved are counted per process.
+'''
+
+import re
+
+# contents of these elements are never rewritten (a <pre> also covers its <code>)
+PRESERVE_RE = re.compile(r"(<(pre|code|textarea|script|style)\b.*?</\2\s*>)",
+                         re.DOTALL | re.IGNORECASE)
+# HTML whitespace only: \s would also match non-breaking spaces
+WHITESPACE_RE = re.compile(r"[ \t\n\r\f]+")
+# a tag with quoted attribute values, or a run of whitespace outside one
+TAG_OR_WHITESPACE_RE = re.compile(
+    r"""(<[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)+>)|[ \t\n\r\f]+""")
+QUOTED_RE = re.compile(r"""("[^"]*"|'[^']*')""")
+BLOCK_TAG_RE = re.compile(
+    r" ?(</?(?:!doctype|html|head|body|title|meta|link|article|section|nav|header|footer|"
+    r"main|aside|div|p|h[1-6]|ul|ol|li|blockquote|pre|hr|table|thead|tbody|tr|td|th)\b"
+    r"[^>]*>) ?", re.IGNORECASE)
+
+_enabled = False
+saved_bytes = 0
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+def is_enabled():
+    return _enabled
+
+def collapse_tag_or_whitespace(match):
+    tag = match.group(1)
+    if tag is None:
+        return " "
+    # split() returns [outside quotes, quoted value, outside quotes, ...]
+    return "".join(part if i % 2 else WHITESPACE_RE.sub(" ", part)
+                   for i, part in enumerate(QUOTED_RE.split(tag)))
+
+def collapse_whitespace(html):
+    '''Minifies html that contains no preserved elements'''
+
+    return BLOCK_TAG_RE.sub(r"\1", TAG_OR_WHITESPACE_RE.sub(collapse_tag_or_whitespace, html))
+
+def minify_html(html):
+    '''Returns html with insignificant whitespace removed'''
+
+    # split() returns [text, preserved element, its tag name, text, ...]
+    parts = PRESERVE_RE.split(html)
+    minified = []
+    for i in range(0, len(parts), 3):
+        minified.append(collapse_whitespace(parts[i]))
+        if i + 1 < len(parts):
+            minified.append(parts[i + 1])
+    return "".join(minified)
+
+def minify_content(html):
+    '''
+    minify_html for generated content, adding the bytes saved to saved_bytes
+    (only ASCII whitespace is removed, so characters are bytes here)
+    '''
+
+    global saved_bytes
+    minified = minify_html(html)
+    saved_bytes += len(html) - len(minified)
+    return minified
+
+def report_saved(content_bytes, template_bytes, pages):
+    '''Prints the bytes minification saved across pages built with a template'''
+
+    total = content_bytes + template_bytes * pages
+    print(f">>> Minify: {total} bytes saved over {pages} pages "
+          f"({content_bytes} in content, {template_bytes} per page in the template)")
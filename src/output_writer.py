@@ -0,0 +1,80 @@
+# src/output_writer.py
+
+'''
+Writer stage for generated pages.
+
+Every page is written to a temporary file next to its destination and then compared
+with the existing output: identical files are left alone (so their mtimes don't churn
+and CDN syncs skip them), changed ones are swapped in atomically with os.replace.
+Destination folders are created once per build instead of checked per page.
+'''
+
+import contextlib
+import os
+
+import manifest
+
+
+class OutputWriter():
+
+    '''Folders already created plus written/unchanged counts for one build (or worker)'''
+
+    def __init__(self):
+        self.dirs = set()
+        self.written = 0
+        self.unchanged = 0
+
+    def make_dirs(self, dest_dirs):
+        '''Creates each folder in dest_dirs that this writer hasn't created yet'''
+
+        for dest_dir in dest_dirs:
+            if dest_dir and dest_dir not in self.dirs:
+                # exist_ok: parallel workers may race to create the same folder
+                os.makedirs(dest_dir, exist_ok=True)
+                self.dirs.add(dest_dir)
+
+    @contextlib.contextmanager
+    def open(self, dest_path):
+        '''
+        Context manager yielding a text stream for dest_path. The output only replaces
+        dest_path once the with-block finishes, and only if it differs; if the block
+        raises, the existing file is left untouched.
+        '''
+
+        self.make_dirs([os.path.dirname(dest_path)])
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                yield f
+            if is_same_file_content(tmp_path, dest_path):
+                os.remove(tmp_path)
+                self.unchanged += 1
+            else:
+                os.replace(tmp_path, dest_path)
+                self.written += 1
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    def write(self, dest_path, text):
+        '''Writes text to dest_path unless it already holds exactly that'''
+
+        with self.open(dest_path) as f:
+            f.write(text)
+
+    def stats(self):
+        return [self.written, self.unchanged]
+
+def is_same_file_content(new_path, old_path):
+    '''True if old_path exists with the same bytes as new_path (size first, then hash)'''
+
+    try:
+        if os.path.getsize(new_path) != os.path.getsize(old_path):
+            return False
+        return manifest.hash_file(new_path) == manifest.hash_file(old_path)
+    except OSError:
+        return False
+
+def report_output(written, unchanged):
+    print(f">>> Output: {written} written, {unchanged} unchanged")
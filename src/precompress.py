@@ -0,0 +1,126 @@
+# src/precompress.py
+
+'''
+Precompressed gzip sidecars (main.py build --gzip).
+
+After a build, every compressible file in docs/ (generated pages, CSS, the asset
+manifest, ...) gets a name.gz sibling compressed at the maximum level, so a server with
+gzip_static-style support sends those bytes without compressing per request.
+
+Compression is the expensive part, so it is avoided wherever possible:
+    - files whose size and mtime match the last run, with their sidecar still in place,
+      are skipped without being read (unchanged pages keep their mtime, see output_writer)
+    - otherwise the file is hashed, and compressed output is kept in a content-addressed
+      cache (cache_dir/<sha256>.gz), so identical content is only ever compressed once,
+      even after copy_static has wiped docs/
+Files are hashed and compressed by a pool of threads (zlib releases the GIL).
+'''
+
+import gzip
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import copy_static
+import manifest
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml"}
+# below this, gzip framing outweighs the savings
+MIN_SIZE = 256
+
+
+def is_compressible(path, size):
+    return size >= MIN_SIZE and os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+def gzip_bytes(data):
+    '''Maximum-level gzip with a zeroed header timestamp, so equal input gives equal output'''
+
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def cached_gzip(src_path, digest, cache_dir):
+    '''
+    Returns (path of the compressed copy of src_path in cache_dir, True if it had to be
+    compressed now)
+    '''
+
+    cache_path = os.path.join(cache_dir, f"{digest}.gz")
+    if os.path.exists(cache_path):
+        return cache_path, False
+
+    with open(src_path, 'rb') as f:
+        compressed = gzip_bytes(f.read())
+    # identical files may be compressed by two threads at once
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(compressed)
+    os.replace(tmp_path, cache_path)
+    return cache_path, True
+
+def precompress_tree(dest_dir, cache_dir, workers=None):
+    '''
+    Writes or refreshes name.gz for every compressible file under dest_dir and removes
+    sidecars whose file is gone. The record of the last run and the compressed-output
+    cache live in cache_dir. Returns (compressed, reused, unchanged, removed) counts.
+    '''
+
+    start = time.perf_counter()
+    os.makedirs(cache_dir, exist_ok=True)
+    record_path = os.path.join(cache_dir, "sidecars.json")
+    old_records = manifest.load_manifest(record_path)
+    records = {}
+    pending = []
+    sidecars = []
+
+    for rel_path, entry in copy_static.scan_files(dest_dir):
+        if rel_path.endswith(".gz"):
+            sidecars.append(rel_path)
+            continue
+        src_stat = entry.stat()
+        if not is_compressible(rel_path, src_stat.st_size):
+            continue
+        record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        old_record = old_records.get(rel_path)
+        if (old_record and old_record["size"] == record["size"]
+                and old_record["mtime_ns"] == record["mtime_ns"]
+                and os.path.exists(f"{entry.path}.gz")):
+            record["hash"] = old_record["hash"]
+        else:
+            pending.append(rel_path)
+        records[rel_path] = record
+
+    def refresh_sidecar(rel_path):
+        src_path = os.path.join(dest_dir, rel_path)
+        digest = manifest.hash_file(src_path)
+        records[rel_path]["hash"] = digest
+        cache_path, compressed = cached_gzip(src_path, digest, cache_dir)
+        sidecar_path = f"{src_path}.gz"
+        tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+        copy_static.clone_file(cache_path, tmp_path)
+        os.replace(tmp_path, sidecar_path)
+        return compressed
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        compressed = sum(executor.map(refresh_sidecar, pending))
+
+    # only sidecars this stage wrote: a .gz shipped in static/ is left alone
+    removed = 0
+    for rel_path in sidecars:
+        if rel_path[:-3] in old_records and rel_path[:-3] not in records:
+            os.remove(os.path.join(dest_dir, rel_path))
+            removed += 1
+
+    # the cache only needs to hold this build's outputs
+    live_blobs = {f"{record['hash']}.gz" for record in records.values()}
+    for name in os.listdir(cache_dir):
+        if name.endswith(".gz") and name not in live_blobs:
+            os.remove(os.path.join(cache_dir, name))
+
+    manifest.save_manifest(record_path, records)
+
+    unchanged = len(records) - len(pending)
+    reused = len(pending) - compressed
+    print(f">>> Gzip sidecars: {compressed} compressed, {reused} reused from cache, "
+          f"{unchanged} unchanged, {removed} removed ({time.perf_counter() - start:.3f}s)")
+    return compressed, reused, unchanged, removed
@@ -0,0 +1,194 @@
+# src/profiler.py
+
+'''
+Per-stage build profiling.
+
+A profiled build generates each page with its stages run one after another instead of
+interleaved (as the streaming build does), so each can be timed on its own:
+
+    read       reading the markdown file
+    split      markdown_to_blocks
+    type       classify_block for every block: its type and the lines it splits into
+    inline     rendering every classified block with the direct renderer the normal
+               build streams pages with (BLOCK_RENDERERS): inline parsing and HTML
+               serialization, which it does in one pass without building nodes
+    minify     minifying each rendered block (only with --minify)
+    template   splicing title and content into the compiled template
+    write      writing the HTML file
+
+Blocks skip the block cache so every one of them is classified and rendered; in a
+normal build, blocks repeated across pages are rendered once.
+
+The pages written are the same as a normal build's, minified with --minify. A profiled
+build is serial and from scratch (no --incremental, --jobs or --cache), so every page
+goes through every stage.
+'''
+
+import contextlib
+import cProfile
+import os
+import time
+import tracemalloc
+
+import generate_page
+import markdown_to_node
+import minify
+import output_writer
+import templates
+
+STAGES = ("read", "split", "type", "inline", "minify", "template", "write")
+
+
+def percentile(values, pct):
+    '''Nearest-rank percentile of values (pct from 0 to 100); 0 for no values'''
+
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+
+class BuildProfiler():
+
+    '''Per-page, per-stage timings and allocations for one build'''
+
+    def __init__(self, track_allocations=True):
+        self.track_allocations = track_allocations
+        # [(from_path, {stage: seconds}, {stage: bytes allocated})]
+        self.pages = []
+
+    def start_page(self, from_path):
+        self.pages.append((from_path, dict.fromkeys(STAGES, 0.0), dict.fromkeys(STAGES, 0)))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''Adds the with-block's time (and peak allocations) to this stage of the current page'''
+
+        _, times, allocations = self.pages[-1]
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            times[name] += time.perf_counter() - start
+            if self.track_allocations:
+                allocations[name] += tracemalloc.get_traced_memory()[1] - before
+
+    def report(self, top=10):
+        '''Prints per-stage totals with p50/p95 over pages, then the slowest pages'''
+
+        if not self.pages:
+            print(">>> Profile: no pages generated")
+            return
+
+        page_totals = [(sum(times.values()), from_path, times)
+                       for from_path, times, _ in self.pages]
+        build_total = sum(total for total, _, _ in page_totals)
+
+        print(f">>> Profile of {len(self.pages)} pages, {build_total * 1000:.1f} ms in page stages")
+        print(f"{'stage':<11}{'total ms':>10}{'share':>8}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'alloc KiB':>11}")
+        for name in STAGES:
+            stage_times = [times[name] for _, times, _ in self.pages]
+            stage_total = sum(stage_times)
+            allocated = sum(allocations[name] for _, _, allocations in self.pages)
+            share = stage_total / build_total if build_total else 0
+            alloc = f"{allocated / 1024:>11.1f}" if self.track_allocations else f"{'-':>11}"
+            print(f"{name:<11}{stage_total * 1000:>10.2f}{share:>8.1%}"
+                  f"{percentile(stage_times, 50) * 1000:>9.3f}"
+                  f"{percentile(stage_times, 95) * 1000:>9.3f}{alloc}")
+
+        totals = [total for total, _, _ in page_totals]
+        print(f">>> Per page: p50 {percentile(totals, 50) * 1000:.3f} ms, "
+              f"p95 {percentile(totals, 95) * 1000:.3f} ms")
+
+        print(f">>> Slowest {min(top, len(page_totals))} pages:")
+        for total, from_path, times in sorted(page_totals, key=lambda page: -page[0])[:top]:
+            slowest_stage = max(STAGES, key=times.get)
+            print(f"    {total * 1000:>9.3f} ms  {from_path} (mostly {slowest_stage})")
+
+
+def profile_page(basepath, from_path, template, dest_path, profiler, writer=None):
+    '''Generates one page like generate_page.build_page_file, recording each stage'''
+
+    profiler.start_page(from_path)
+    with profiler.stage("read"):
+        with open(from_path, 'r', encoding='utf-8') as f:
+            markdown = f.read()
+    with profiler.stage("split"):
+        blocks = markdown_to_node.markdown_to_blocks(markdown)
+    with profiler.stage("type"):
+        title = None
+        classified = []
+        for block in blocks:
+            if title is None:
+                title = markdown_to_node.block_title(block)
+            classified.append(markdown_to_node.classify_block(block))
+    if title is None:
+        raise ValueError("No toplevel header found in markdown")
+    with profiler.stage("inline"):
+        rendered = [markdown_to_node.BLOCK_RENDERERS[block_type](block, lines, basepath)
+                    for block, (block_type, lines) in zip(blocks, classified)]
+    if minify.is_enabled():
+        # block by block, as stream_page does, so the output matches a normal build's
+        with profiler.stage("minify"):
+            rendered = [minify.minify_content(html) for html in rendered]
+    with profiler.stage("template"):
+        content = f"<div>{''.join(rendered)}</div>"
+        html = templates.render_template(template, Title=title, Content=content)
+    with profiler.stage("write"):
+        generate_page.write_page(dest_path, html, writer)
+
+def profile_build(basepath, dir_path_content, template_path, dest_dir_path,
+                  track_allocations=True, dump_path=None):
+    '''
+    Serially generates every page with a BuildProfiler and prints its report.
+    With dump_path, the build also runs under cProfile and the stats are saved there
+    (inspect with python3 -m pstats).
+
+    Returns the list of failures (see generate_page.generate_pages).
+    '''
+
+    pages = generate_page.find_pages(dir_path_content, dest_dir_path)
+    print(f">>> Profiling build of {len(pages)} pages")
+    template = templates.load_template(template_path, basepath)
+    profiler = BuildProfiler(track_allocations)
+    writer = output_writer.OutputWriter()
+    saved_bytes = minify.saved_bytes
+
+    profile = cProfile.Profile() if dump_path else None
+    if track_allocations:
+        tracemalloc.start()
+    if profile:
+        profile.enable()
+
+    failures = []
+    try:
+        for from_path, dest_path in pages:
+            try:
+                profile_page(basepath, from_path, template, dest_path, profiler, writer)
+            except Exception as e:
+                failures.append((from_path, f"{type(e).__name__}: {e}"))
+    finally:
+        if profile:
+            profile.disable()
+        if track_allocations:
+            tracemalloc.stop()
+
+    generate_page.report_failures(failures)
+    output_writer.report_output(writer.written, writer.unchanged)
+    if minify.is_enabled():
+        minify.report_saved(minify.saved_bytes - saved_bytes,
+                            templates.template_bytes_saved(template_path, basepath),
+                            writer.written + writer.unchanged)
+    profiler.report()
+    if profile:
+        dump_dir = os.path.dirname(dump_path)
+        if dump_dir:
+            os.makedirs(dump_dir, exist_ok=True)
+        profile.dump_stats(dump_path)
+        print(f">>> cProfile stats written to {dump_path}")
+    return failures
@@ -0,0 +1,210 @@
+# src/render_server.py
+
+'''
+Persistent render daemon (main.py serve-render): keeps a warm interpreter, the compiled
+template and the block cache around, and renders markdown on request over a Unix socket.
+
+The protocol is one JSON object per line in each direction, any number per connection:
+
+    {"id": 1, "markdown": "# Hi", "page": true}  ->  {"id": 1, "html": "...", "error": null,
+                                                       "queue_ms": 0.01, "render_ms": 0.2}
+    {"op": "stats"}                              ->  {"count": ..., "render_p50_ms": ..., ...}
+
+"page": false returns only the content HTML. Requests from every connection go through
+one queue to a pool of worker threads; each one's queue wait and render time is recorded.
+'''
+
+import collections
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from concurrent.futures import Future
+
+import batch
+import profiler
+
+DEFAULT_SOCKET_PATH = ".cache/render.sock"
+# latencies kept for percentiles; older requests only count towards the totals
+LATENCY_WINDOW = 10000
+
+
+class LatencyStats():
+
+    '''Per-request queue wait and render times, shared by the worker threads'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.queue_times = collections.deque(maxlen=LATENCY_WINDOW)
+        self.render_times = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, queue_seconds, render_seconds, failed):
+        with self.lock:
+            self.count += 1
+            self.errors += failed
+            self.queue_times.append(queue_seconds)
+            self.render_times.append(render_seconds)
+
+    def snapshot(self):
+        '''Counts plus p50/p95/max in milliseconds, over the last LATENCY_WINDOW requests'''
+
+        with self.lock:
+            queue_times = list(self.queue_times)
+            render_times = list(self.render_times)
+            totals = [wait + render for wait, render in zip(queue_times, render_times)]
+            stats = {"count": self.count, "errors": self.errors}
+        for name, values in (("queue", queue_times), ("render", render_times),
+                             ("total", totals)):
+            stats[f"{name}_p50_ms"] = profiler.percentile(values, 50) * 1000
+            stats[f"{name}_p95_ms"] = profiler.percentile(values, 95) * 1000
+            stats[f"{name}_max_ms"] = max(values, default=0) * 1000
+        return stats
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+
+    '''One client connection: reads request lines, answers each in order'''
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                response = {"error": f"bad request: {e}"}
+            else:
+                if request.get("op") == "stats":
+                    response = self.server.stats.snapshot()
+                else:
+                    response = self.server.submit(request).result()
+            try:
+                self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+
+class RenderServer(socketserver.ThreadingUnixStreamServer):
+
+    '''Unix socket server feeding a request queue drained by a pool of render workers'''
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, template_path="template.html", basepath="/", workers=4):
+        remove_stale_socket(socket_path)
+        socket_dir = os.path.dirname(socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        super().__init__(socket_path, RenderRequestHandler)
+
+        self.socket_path = socket_path
+        self.page_renderer = batch.BatchRenderer(template_path, basepath)
+        self.fragment_renderer = batch.BatchRenderer(basepath=basepath)
+        self.stats = LatencyStats()
+        self.requests = queue.Queue()
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, request):
+        '''Queues a render request; returns a Future for its response'''
+
+        future = Future()
+        self.requests.put((time.perf_counter(), request, future))
+        return future
+
+    def work(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            queued_at, request, future = item
+
+            start = time.perf_counter()
+            response = {"id": request.get("id"), "html": None, "error": None}
+            try:
+                renderer = (self.page_renderer if request.get("page", True)
+                            else self.fragment_renderer)
+                response["html"] = renderer.render(request["markdown"])
+            except Exception as e:
+                response["error"] = f"{type(e).__name__}: {e}"
+            end = time.perf_counter()
+
+            self.stats.record(start - queued_at, end - start, response["error"] is not None)
+            response["queue_ms"] = (start - queued_at) * 1000
+            response["render_ms"] = (end - start) * 1000
+            future.set_result(response)
+
+    def server_close(self):
+        for _ in self.workers:
+            self.requests.put(None)
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+def remove_stale_socket(socket_path):
+    '''
+    Removes a socket file left behind by a crashed server, which would make bind fail.
+    Only a socket nobody is listening on is removed: anything else at socket_path
+    (another file, or a socket a running server still accepts on) raises FileExistsError.
+    '''
+
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    raise FileExistsError(f"a server is already listening on {socket_path}")
+
+def report_stats(stats):
+    print(f">>> Rendered {stats['count']} requests ({stats['errors']} errors); "
+          f"render p50 {stats['render_p50_ms']:.3f} ms, p95 {stats['render_p95_ms']:.3f} ms; "
+          f"total p50 {stats['total_p50_ms']:.3f} ms, p95 {stats['total_p95_ms']:.3f} ms")
+
+def serve_render(socket_path=DEFAULT_SOCKET_PATH, template_path="template.html", basepath="/",
+                 workers=4):
+    '''Serves render requests on socket_path until interrupted, then prints latency stats'''
+
+    server = RenderServer(socket_path, template_path, basepath, workers)
+    print(f">>> Rendering on {socket_path} with {workers} workers (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(">>> Stopping render server")
+    finally:
+        server.server_close()
+        report_stats(server.stats.snapshot())
+
+def send_requests(socket_path, requests):
+    '''
+    Minimal client: sends each request dict over one connection and returns the
+    responses in order
+    '''
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile('rwb') as stream:
+            responses = []
+            for item in requests:
+                stream.write(json.dumps(item).encode('utf-8') + b"\n")
+                stream.flush()
+                responses.append(json.loads(stream.readline()))
+            return responses
@@ -0,0 +1,353 @@
+# src/responsive.py
+
+'''
+Responsive image variants (main.py build --responsive-widths 400,800).
+
+Every image referenced from the content with ![alt](/images/x.png) gets downscaled
+copies at each configured width smaller than the original, published next to it as
+images/x.400w.<hash>.png, and the generated <img> tags list them in srcset/sizes
+(see images.set_variants) so browsers fetch the smallest one that fits.
+
+Variants live in a content-addressed derivative cache (cache_dir/<key>.png, the key
+hashing the source bytes, the width and VARIANT_VERSION), so each one is produced once
+and then only copied. Missing variants are produced on a pool of processes, one task
+per source image so it is decoded once for all its widths.
+
+There is no imaging library to rely on, so decoding, resizing (area averaging) and
+encoding are done here with zlib, for 8-bit non-interlaced grayscale, RGB and RGBA PNGs.
+Other images keep a plain src.
+'''
+
+import hashlib
+import operator
+import os
+import struct
+import time
+import zlib
+
+import copy_static
+import depgraph
+import images
+import manifest
+
+DEFAULT_WIDTHS = (400, 800)
+# the content column is at most 800px wide (see static/index.css)
+DEFAULT_SIZES = "(max-width: 800px) 100vw, 800px"
+# bump when resizing or encoding changes, to regenerate every cached variant
+VARIANT_VERSION = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# color type -> bytes per pixel (at bit depth 8)
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+
+def parse_widths(text):
+    '''"400,800" -> (400, 800), for argparse'''
+
+    try:
+        widths = tuple(sorted({int(width) for width in text.split(",") if width.strip()}))
+    except ValueError as exc:
+        raise ValueError(f"invalid widths: {text}") from exc
+    if not widths or widths[0] <= 0:
+        raise ValueError(f"invalid widths: {text}")
+    return widths
+
+# PNG decoding and encoding
+
+def read_png(path):
+    '''
+    Returns (width, height, color type, pixels) for an 8-bit non-interlaced grayscale,
+    RGB or RGBA PNG, pixels being the unfiltered rows back to back. Raises ValueError
+    for anything else.
+    '''
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG")
+
+    pos = len(PNG_SIGNATURE)
+    header = None
+    compressed = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"IDAT":
+            compressed.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None:
+        raise ValueError("PNG without IHDR")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise ValueError(f"unsupported PNG (bit depth {bit_depth}, color type {color_type}, "
+                         f"interlace {interlace})")
+
+    bpp = PNG_CHANNELS[color_type]
+    pixels = unfilter(zlib.decompress(b"".join(compressed)), width * bpp, height, bpp)
+    return width, height, color_type, pixels
+
+def unfilter(data, stride, height, bpp):
+    '''Reverses the per-row PNG filters of decompressed image data'''
+
+    pixels = bytearray(stride * height)
+    previous = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        filter_type = data[pos]
+        row = bytearray(data[pos + 1:pos + 1 + stride])
+        pos += stride + 1
+
+        if filter_type == 1:  # Sub
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xff
+        elif filter_type == 2:  # Up
+            row = bytearray(map(lambda value, up: (value + up) & 0xff, row, previous))
+        elif filter_type == 3:  # Average
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xff
+        elif filter_type == 4:  # Paeth
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                up = previous[i]
+                up_left = previous[i - bpp] if i >= bpp else 0
+                estimate = left + up - up_left
+                distance_left = abs(estimate - left)
+                distance_up = abs(estimate - up)
+                distance_up_left = abs(estimate - up_left)
+                if distance_left <= distance_up and distance_left <= distance_up_left:
+                    predictor = left
+                elif distance_up <= distance_up_left:
+                    predictor = up
+                else:
+                    predictor = up_left
+                row[i] = (row[i] + predictor) & 0xff
+        elif filter_type != 0:
+            raise ValueError(f"bad PNG filter type {filter_type}")
+
+        pixels[y * stride:(y + 1) * stride] = row
+        previous = row
+    return pixels
+
+def png_chunk(chunk_type, data):
+    return (struct.pack(">I", len(data)) + chunk_type + data
+            + struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+# byte -> its distance from 0 as a signed byte, for scoring filtered rows
+SIGNED_DISTANCE = bytes(min(value, 256 - value) for value in range(256))
+
+def filter_row(row, previous, bpp):
+    '''
+    Returns (filter type, filtered row) for the None/Sub/Up/Average filter whose output
+    is closest to zero, the usual heuristic for what deflate compresses best
+    '''
+
+    left = bytes(bpp) + row[:-bpp]
+    candidates = [
+        (0, bytes(row)),
+        (1, bytes(map(lambda value, before: (value - before) & 0xff, row, left))),
+        (2, bytes(map(lambda value, up: (value - up) & 0xff, row, previous))),
+        (3, bytes(map(lambda value, before, up: (value - ((before + up) >> 1)) & 0xff,
+                      row, left, previous))),
+    ]
+    return min(candidates, key=lambda candidate: sum(candidate[1].translate(SIGNED_DISTANCE)))
+
+def encode_png(width, height, color_type, pixels):
+    '''Encodes unfiltered 8-bit pixels as a PNG, choosing a filter per row'''
+
+    bpp = PNG_CHANNELS[color_type]
+    stride = width * bpp
+    raw = bytearray()
+    previous = bytes(stride)
+    for y in range(height):
+        row = pixels[y * stride:(y + 1) * stride]
+        filter_type, filtered = filter_row(row, previous, bpp)
+        raw.append(filter_type)
+        raw += filtered
+        previous = row
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (PNG_SIGNATURE + png_chunk(b"IHDR", header)
+            + png_chunk(b"IDAT", zlib.compress(bytes(raw), 9)) + png_chunk(b"IEND", b""))
+
+def resize(width, height, bpp, pixels, new_width):
+    '''
+    Downscales pixels to new_width (height in proportion) by averaging the block of
+    source pixels behind each output pixel. Returns (new height, new pixels).
+    Rows are summed first with map() so the per-pixel work only runs on output rows.
+    '''
+
+    new_height = max(1, round(height * new_width / width))
+    stride = width * bpp
+    column_ranges = [(x * width // new_width, max(x * width // new_width + 1,
+                                                  (x + 1) * width // new_width))
+                     for x in range(new_width)]
+
+    resized = bytearray()
+    for y in range(new_height):
+        first_row = y * height // new_height
+        last_row = max(first_row + 1, (y + 1) * height // new_height)
+        sums = list(pixels[first_row * stride:(first_row + 1) * stride])
+        for source_row in range(first_row + 1, last_row):
+            sums = list(map(operator.add, sums,
+                            pixels[source_row * stride:(source_row + 1) * stride]))
+
+        rows = last_row - first_row
+        for first_column, last_column in column_ranges:
+            count = rows * (last_column - first_column)
+            for channel in range(bpp):
+                total = sum(sums[first_column * bpp + channel:last_column * bpp:bpp])
+                resized.append((total + count // 2) // count)
+    return new_height, resized
+
+# variants
+
+def referenced_images(content_dir, static_dir, old_pages=None):
+    '''
+    Returns {image URL: static path} for the root-relative images the content embeds.
+    With old_pages (the incremental build manifest's pages), unchanged pages reuse the
+    images recorded there instead of being read again (see depgraph.read_page).
+    '''
+
+    old_pages = old_pages or {}
+    found = {}
+    for dir_path, _, file_names in os.walk(content_dir):
+        for name in file_names:
+            if not name.endswith(".md"):
+                continue
+            from_path = os.path.join(dir_path, name)
+            for url in depgraph.read_page(from_path, old_pages.get(from_path))["images"]:
+                path = os.path.join(static_dir, url.lstrip("/"))
+                if url.startswith("/") and not url.startswith("//") and os.path.isfile(path):
+                    found[url] = path
+    return found
+
+def variant_key(source_hash, width):
+    return hashlib.sha256(f"{VARIANT_VERSION}\0{source_hash}\0{width}".encode()).hexdigest()
+
+def variant_url(url, width, key):
+    '''"/images/tom.png" -> "/images/tom.400w.<key prefix>.png"'''
+
+    stem, ext = os.path.splitext(url)
+    return f"{stem}.{width}w.{key[:8]}{ext}"
+
+def make_variants(task):
+    '''
+    Process pool work unit: decodes one source image and writes each of its missing
+    (width, cache path) variants. Returns an error message, or None.
+    '''
+
+    src_path, targets = task
+    try:
+        width, height, color_type, pixels = read_png(src_path)
+    except (OSError, ValueError, zlib.error, struct.error) as e:
+        return f"{type(e).__name__}: {e}"
+
+    for new_width, cache_path in targets:
+        new_height, resized = resize(width, height, PNG_CHANNELS[color_type], pixels, new_width)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encode_png(new_width, new_height, color_type, resized))
+        os.replace(tmp_path, cache_path)
+    return None
+
+def build_variants(content_dir, static_dir, dest_dir, cache_dir, widths=DEFAULT_WIDTHS,
+                   jobs=1, old_pages=None):
+    '''
+    Makes sure dest_dir holds every variant of every referenced PNG, producing the ones
+    missing from cache_dir on a pool of jobs processes, and removes variants a previous
+    build published that are no longer needed. Images that can't be decoded are reported
+    once and skipped until they change; variants that come out no smaller than their
+    source are left out of srcset. old_pages is passed on to referenced_images.
+
+    Returns {image URL: [(width, variant URL), ..., (original width, image URL)]}
+    for images that have variants.
+    '''
+
+    start = time.perf_counter()
+    record_path = os.path.join(cache_dir, "variants.json")
+    old_records = manifest.load_manifest(record_path)
+    records = {}
+    tasks = {}
+
+    for url, src_path in sorted(referenced_images(content_dir, static_dir, old_pages).items()):
+        if os.path.splitext(url)[1].lower() != ".png":
+            continue
+        src_stat = os.stat(src_path)
+        old_record = old_records.get(url)
+        if (old_record and old_record["size"] == src_stat.st_size
+                and old_record["mtime_ns"] == src_stat.st_mtime_ns):
+            record = dict(old_record)
+        else:
+            dimensions = images.read_dimensions(src_path)
+            record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns,
+                      "hash": manifest.hash_file(src_path),
+                      "width": dimensions[0] if dimensions else 0, "error": None}
+        # the widths may have been reconfigured since the record was written
+        record["variants"] = {
+            width: variant_key(record["hash"], width) for width in widths if width < record["width"]
+        }
+        records[url] = record
+        if record["error"]:
+            continue
+
+        targets = []
+        for width, key in record["variants"].items():
+            cache_path = os.path.join(cache_dir, key[:2], f"{key}.png")
+            if not os.path.exists(cache_path):
+                targets.append((width, cache_path))
+        if targets:
+            tasks[url] = (src_path, targets)
+
+    if len(tasks) > 1 and jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            errors = dict(zip(tasks, executor.map(make_variants, tasks.values())))
+    else:
+        errors = {url: make_variants(task) for url, task in tasks.items()}
+    for url, error in errors.items():
+        if error:
+            print(f"!!! No responsive variants for {url}: {error}")
+            records[url]["error"] = error
+
+    variants = {}
+    published = 0
+    live_paths = set()
+    for url, record in records.items():
+        if record["error"] or not record["variants"]:
+            continue
+        sizes = []
+        for width, key in sorted(record["variants"].items()):
+            cache_path = os.path.join(cache_dir, key[:2], f"{key}.png")
+            if os.path.getsize(cache_path) >= record["size"]:
+                continue
+            url_of_variant = variant_url(url, width, key)
+            dest_path = os.path.join(dest_dir, url_of_variant.lstrip("/"))
+            live_paths.add(dest_path)
+            if not os.path.exists(dest_path):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                copy_static.clone_file(cache_path, dest_path)
+                published += 1
+            sizes.append((width, url_of_variant))
+        if sizes:
+            variants[url] = sizes + [(record["width"], url)]
+
+    removed = 0
+    for url, record in old_records.items():
+        for width, key in record.get("variants", {}).items():
+            stale_path = os.path.join(dest_dir, variant_url(url, width, key).lstrip("/"))
+            if stale_path not in live_paths and os.path.isfile(stale_path):
+                os.remove(stale_path)
+                removed += 1
+
+    manifest.save_manifest(record_path, records)
+    produced = sum(len(targets) for url, (_, targets) in tasks.items() if not errors[url])
+    print(f">>> Responsive images: {len(variants)} images, {produced} variants produced, "
+          f"{published} published, {removed} removed ({time.perf_counter() - start:.3f}s)")
+    return variants
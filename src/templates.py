@@ -0,0 +1,81 @@
+# src/templates.py
+
+'''
+Compiled page templates.
+
+A template is read and compiled once per build into a list of segments:
+even indices are literal HTML, odd indices are placeholder names ("Title", "Content").
+Rendering a page is then a single join.
+'''
+
+import os
+import re
+
+import minify
+import urls
+
+PLACEHOLDER_RE = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTR_RE = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+# (template path, basepath, fingerprints key, minified) -> (mtime, segments, bytes saved)
+_template_cache = {}
+
+
+def compile_template(template, basepath="/", minified=False):
+    '''
+    Splits template source into literal/placeholder segments.
+    Root-relative href/src attributes in the template are pointed at basepath (and at
+    fingerprinted assets) here, once; generated content is rebased when its nodes are
+    created (see markdown_to_html_node).
+    With minified, insignificant whitespace is removed as well (see minify).
+    '''
+
+    if minified:
+        template = minify.minify_html(template)
+    template = URL_ATTR_RE.sub(
+        lambda match: f'{match[1]}="{urls.rebase_url(match[2], basepath)}"', template)
+    return PLACEHOLDER_RE.split(template)
+
+def load_template(template_path, basepath="/"):
+    '''
+    Returns the compiled template at template_path.
+    Compiled templates are cached per process and recompiled only when the file changes.
+    The template is minified while minification is enabled for the build.
+    '''
+
+    return _load_template(template_path, basepath)[0]
+
+def template_bytes_saved(template_path, basepath="/"):
+    '''Bytes minification removes from every page built with the template (0 if disabled)'''
+
+    return _load_template(template_path, basepath)[1]
+
+def _load_template(template_path, basepath):
+    mtime = os.stat(template_path).st_mtime_ns
+    minified = minify.is_enabled()
+    key = (template_path, basepath, urls.fingerprints_key(), minified)
+    cached = _template_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1:]
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        template = f.read()
+    segments = compile_template(template, basepath, minified)
+    saved = 0
+    if minified:
+        saved = (len("".join(compile_template(template, basepath)).encode('utf-8'))
+                 - len("".join(segments).encode('utf-8')))
+    _template_cache[key] = (mtime, segments, saved)
+    return segments, saved
+
+def render_template(segments, **values):
+    '''
+    Fills each placeholder from values and joins the page in one go.
+    Placeholders without a value are left as they were in the template.
+    '''
+
+    rendered = segments[:]
+    for i in range(1, len(rendered), 2):
+        name = rendered[i]
+        rendered[i] = values.get(name, f"{{{{ {name} }}}}")
+    return "".join(rendered)
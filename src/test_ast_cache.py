@@ -0,0 +1,71 @@
+# src/test_ast_cache.py
+
+'''We testing the AST cache'''
+
+import os
+import unittest
+from unittest import mock
+
+import ast_cache
+import markdown_to_node
+
+from fixtures import TempDirTestCase
+
+
+class TestASTCache(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ast_cache.ASTCache(self.root)
+
+    def test_parse_page_hit_and_miss(self):
+        md = "# Title\n\nSome **bold** text"
+        expected = markdown_to_node.markdown_to_page(md)
+
+        self.assertEqual(self.cache.parse_page(md), expected)
+        self.assertEqual(self.cache.parse_page(md), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # a fresh handle on the same directory (e.g. the next build) still hits
+        other = ast_cache.ASTCache(self.root)
+        self.assertEqual(other.markdown_to_html_node(md), expected[1])
+        self.assertEqual(other.hits, 1)
+
+    def test_key_depends_on_basepath_and_parser_version(self):
+        key = self.cache.key("# Title")
+
+        self.assertNotEqual(key, self.cache.key("# Title", "/site/"))
+        with mock.patch.object(markdown_to_node, "PARSER_VERSION", -1):
+            self.assertNotEqual(key, self.cache.key("# Title"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, ("Title", None))
+        with open(self.cache.entry_path(key), 'wb') as f:
+            f.write(b"not a pickle")
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_evict_least_recently_used(self):
+        for i in range(4):
+            key = self.cache.key(f"# Page {i}")
+            self.cache.put(key, "x" * 1000)
+            os.utime(self.cache.entry_path(key), ns=(i, i))
+        entry_size = os.path.getsize(self.cache.entry_path(key))
+
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertIsNone(self.cache.get(self.cache.key("# Page 0")))
+        self.assertIsNotNone(self.cache.get(self.cache.key("# Page 3")))
+
+    def test_block_cache_shares_repeated_blocks(self):
+        footer = "_Thanks for reading!_"
+        first = markdown_to_node.cached_block_to_node(footer)
+
+        self.assertIs(markdown_to_node.cached_block_to_node(footer), first)
+        self.assertEqual(first, markdown_to_node.block_to_node(footer))
+
+
+if __name__ == "__main__":
+    unittest.main()
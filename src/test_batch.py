@@ -0,0 +1,58 @@
+# src/test_batch.py
+
+'''We testing the batch rendering API'''
+
+import os
+import unittest
+
+import batch
+import generate_page
+import markdown_to_node
+import templates
+
+from fixtures import TempDirTestCase
+
+
+class TestBatch(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.template_path = self.write(
+            "template.html", '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.documents = [(f"doc{i}", f"# Doc {i}\n\nSee [home](/) and **item {i}**")
+                          for i in range(50)]
+        self.documents[7] = ("bad", "no title and an odd ** delimiter")
+
+    def test_render_many_pages(self):
+        template = templates.load_template(self.template_path, "/site/")
+        results = list(batch.render_many(iter(self.documents), self.template_path, "/site/"))
+
+        self.assertEqual([doc_id for doc_id, _, _ in results],
+                         [doc_id for doc_id, _ in self.documents])
+        self.assertEqual(results[0][1],
+                         generate_page.render_page("/site/", self.documents[0][1], template))
+        self.assertEqual(results[7][1], None)
+        self.assertIn("ValueError", results[7][2])
+
+    def test_render_many_fragments(self):
+        (doc_id, html, error), = batch.render_many([("a", "# A\n\n- x")], basepath="/site/")
+
+        self.assertEqual((doc_id, error), ("a", None))
+        self.assertEqual(html, markdown_to_node.markdown_to_html_node("# A\n\n- x").to_html())
+
+    def test_parallel_and_cached_match_serial(self):
+        serial = list(batch.render_many(self.documents, self.template_path))
+        parallel = list(batch.render_many((document for document in self.documents),
+                                          self.template_path, jobs=2, chunk_size=4))
+        renderer = batch.BatchRenderer(self.template_path,
+                                       cache_dir=os.path.join(self.root, "ast"))
+        cached = list(renderer.render_many(self.documents))
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual([html for _, html, _ in cached], [html for _, html, _ in serial])
+        self.assertEqual(list(renderer.render_many(self.documents[:3])), serial[:3])
+        self.assertEqual(renderer.cache.hits, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# src/test_copy_static.py
+
+'''We testing static file sync'''
+
+import os
+import tempfile
+import unittest
+
+import copy_static
+
+from fixtures import TempDirTestCase
+
+
+class TestSyncStatic(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.manifest = os.path.join(root, ".cache", "static.json")
+
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png bytes")
+        self.write(os.path.join(self.static, ".DS_Store"), "junk")
+
+    def sync(self, **kwargs):
+        return copy_static.sync_static(self.static, self.dest, self.manifest, **kwargs)
+
+    def test_sync_copies_only_changes(self):
+        self.assertEqual(self.sync(), (2, 0, 0))
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "a.png")), "png bytes")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, ".DS_Store")))
+        self.assertEqual(self.sync(), (0, 2, 0))
+
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        self.assertEqual(self.sync(), (1, 1, 0))
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body { color: red }")
+
+    def test_sync_removes_stale_files_only(self):
+        self.sync()
+        page = os.path.join(self.dest, "index.html")
+        self.write(page, "<p>generated page</p>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+
+        self.assertEqual(self.sync(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_sync_by_hash_ignores_touched_files(self):
+        self.sync(use_hash=True)
+        css = os.path.join(self.static, "index.css")
+        os.utime(css, ns=(0, 0))
+
+        self.assertEqual(self.sync(use_hash=True), (0, 2, 0))
+
+    def test_sync_hardlink(self):
+        self.sync(hardlink=True)
+
+        src_stat = os.stat(os.path.join(self.static, "index.css"))
+        dest_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(src_stat.st_ino, dest_stat.st_ino)
+        self.assertEqual(self.sync(hardlink=True), (0, 2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestCopyStatic(unittest.TestCase):
+
+    def test_copy_static_threaded(self):
+        with tempfile.TemporaryDirectory(dir=".") as tmp:
+            static = os.path.join(tmp, "static")
+            dest = os.path.join(tmp, "docs")
+            os.makedirs(os.path.join(static, "images", "empty"))
+            os.makedirs(os.path.join(dest, "old"))
+            for i in range(20):
+                with open(os.path.join(static, "images", f"{i}.png"), 'wb') as f:
+                    f.write(bytes([i]) * 100)
+            with open(os.path.join(static, ".DS_Store"), 'wb') as f:
+                f.write(b"junk")
+
+            files, copied_bytes = copy_static.copy_static(static, dest, workers=4)
+
+            self.assertEqual((files, copied_bytes), (20, 2000))
+            self.assertEqual(sorted(os.listdir(dest)), ["images"])
+            self.assertTrue(os.path.isdir(os.path.join(dest, "images", "empty")))
+            with open(os.path.join(dest, "images", "7.png"), 'rb') as f:
+                self.assertEqual(f.read(), bytes([7]) * 100)
+
+    def test_copy_static_keeps_listed_files(self):
+        with tempfile.TemporaryDirectory(dir=".") as tmp:
+            static = os.path.join(tmp, "static")
+            dest = os.path.join(tmp, "docs")
+            os.makedirs(static)
+            os.makedirs(os.path.join(dest, "blog", "old"))
+            os.makedirs(os.path.join(dest, "stale"))
+            for rel_path in ("index.html", "gone.html", os.path.join("blog", "post.html"),
+                             os.path.join("blog", "old", "page.html"),
+                             os.path.join("stale", "page.html")):
+                with open(os.path.join(dest, rel_path), 'w', encoding='utf-8') as f:
+                    f.write("page")
+            with open(os.path.join(static, "index.css"), 'w', encoding='utf-8') as f:
+                f.write("body {}")
+
+            copy_static.copy_static(static, dest, workers=2,
+                                    keep=["index.html", os.path.join("blog", "post.html")])
+
+            self.assertEqual(sorted(os.listdir(dest)), ["blog", "index.css", "index.html"])
+            self.assertEqual(os.listdir(os.path.join(dest, "blog")), ["post.html"])
@@ -0,0 +1,118 @@
+# src/test_depgraph.py
+
+'''We testing the dependency graph'''
+
+import contextlib
+import io
+import os
+import unittest
+
+import depgraph
+import generate_page
+import images
+import manifest
+import urls
+
+from fixtures import TempDirTestCase
+
+
+class TestDependencyGraph(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".cache", "manifest.json")
+
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png")
+        self.write(os.path.join(self.static, "images", "other.png"), "png")
+        self.write(os.path.join(self.content, "index.md"),
+                   "# Home\n\n[Tom](/blog/tom) and [contact](/contact) and [ext](https://a.b)")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"),
+                   "# Tom\n\n![tom](/images/tom.png)\n\n```\n[not a link](/nowhere)\n```")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nNo links")
+
+    def build(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generated, unchanged, _, failures = generate_page.generate_pages_incremental(
+                "/", self.content, self.template, self.dest, self.manifest,
+                static_dir=self.static)
+        self.assertEqual(failures, [])
+        return generated, unchanged, output.getvalue()
+
+    def test_page_references(self):
+        markdown = ("# T\n\n![a](/a.png) [b](/b) [b again](/b) [ext](https://x.y)\n\n"
+                    "```\n[code](/code)\n```")
+
+        self.assertEqual(depgraph.page_references(markdown),
+                         (["/a.png", "/b"], ["/a.png"]))
+
+    def test_graph_recorded_and_broken_links_reported(self):
+        generated, _, output = self.build()
+        pages = manifest.load_manifest(self.manifest)
+        index = pages[os.path.join(self.content, "index.md")]
+        tom_path = os.path.join(self.content, "blog", "tom", "index.md")
+        tom_image = os.path.join(self.static, "images", "tom.png")
+
+        self.assertEqual(generated, 3)
+        self.assertEqual(index["pages"], [tom_path])
+        self.assertEqual(index["template"], self.template)
+        self.assertEqual(pages[tom_path]["assets"], [tom_image])
+        self.assertIsNone(pages[os.path.join(self.content, "about.md")]["basepath"])
+        self.assertIn("/contact", output)
+        self.assertNotIn("/nowhere", output)
+
+        # adding the missing page fixes the link without rebuilding index
+        self.write(os.path.join(self.content, "contact.md"), "# Contact")
+        generated, unchanged, output = self.build()
+        self.assertEqual((generated, unchanged), (1, 3))
+        self.assertNotIn("broken", output)
+
+    def test_image_change_rebuilds_only_the_pages_showing_it(self):
+        self.addCleanup(images.set_dimensions, None)
+        images.set_dimensions({"/images/tom.png": (928, 468)})
+        self.assertEqual(self.build()[:2], (3, 0))
+        pages = manifest.load_manifest(self.manifest)
+        self.assertEqual(pages[os.path.join(self.content, "blog", "tom", "index.md")]["images"],
+                         ["/images/tom.png"])
+        self.assertIsNone(pages[os.path.join(self.content, "about.md")]["image_settings"])
+
+        images.set_dimensions({"/images/tom.png": (928, 468), "/images/other.png": (1, 1)})
+        self.assertEqual(self.build()[:2], (0, 3))
+
+        images.set_dimensions({"/images/tom.png": (10, 10), "/images/other.png": (1, 1)})
+        self.assertEqual(self.build()[:2], (1, 2))
+
+    def test_asset_change_rebuilds_nothing_without_fingerprints(self):
+        self.build()
+        self.write(os.path.join(self.static, "images", "tom.png"), "new png")
+        self.assertEqual(self.build()[:2], (0, 3))
+
+    def test_fingerprint_change_rebuilds_only_dependents(self):
+        self.addCleanup(urls.set_fingerprints, None)
+        urls.set_fingerprints({"/images/tom.png": "/images/tom.1111.png",
+                               "/images/other.png": "/images/other.1111.png"})
+        self.assertEqual(self.build()[:2], (3, 0))
+        pages = manifest.load_manifest(self.manifest)
+        tom_path = os.path.join(self.content, "blog", "tom", "index.md")
+        self.assertEqual(pages[tom_path]["fingerprinted"],
+                         {"/images/tom.png": "/images/tom.1111.png"})
+
+        urls.set_fingerprints({"/images/tom.png": "/images/tom.2222.png",
+                               "/images/other.png": "/images/other.1111.png"})
+        self.assertEqual(self.build()[:2], (1, 2))
+
+        urls.set_fingerprints({"/images/tom.png": "/images/tom.2222.png",
+                               "/images/other.png": "/images/other.2222.png"})
+        self.assertEqual(self.build()[:2], (0, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
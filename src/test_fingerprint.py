@@ -0,0 +1,88 @@
+# src/test_fingerprint.py
+
+'''We testing asset fingerprinting'''
+
+import contextlib
+import io
+import json
+import os
+import unittest
+
+import fingerprint
+import markdown_to_node
+import templates
+import urls
+
+from fixtures import TempDirTestCase
+
+
+class TestFingerprint(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.cache_path = os.path.join(self.root, "fingerprints.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join("static", "index.css"), "body {}")
+        self.write(os.path.join("static", "images", "tom.png"), "png")
+
+    def tearDown(self):
+        urls.set_fingerprints(None)
+
+    def fingerprint(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fingerprint.fingerprint_assets(self.static, self.docs, self.cache_path)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprint.fingerprinted_path("images/tom.png", "66709e99abc"),
+                         "images/tom.66709e99.png")
+        self.assertEqual(fingerprint.fingerprinted_path("LICENSE", "66709e99abc"),
+                         "LICENSE.66709e99")
+
+    def test_publishes_copies_and_manifest(self):
+        fingerprints = self.fingerprint()
+
+        self.assertEqual(sorted(fingerprints), ["/images/tom.png", "/index.css"])
+        css_url = fingerprints["/index.css"]
+        self.assertRegex(css_url, r"^/index\.[0-9a-f]{8}\.css$")
+        with open(os.path.join(self.docs, css_url[1:]), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), "body {}")
+        with open(os.path.join(self.docs, fingerprint.ASSET_MANIFEST_NAME), 'r',
+                  encoding='utf-8') as f:
+            self.assertEqual(json.load(f), fingerprints)
+
+    def test_changed_asset_replaces_old_copy(self):
+        old_url = self.fingerprint()["/index.css"]
+        self.write(os.path.join("static", "index.css"), "body { margin: 0 }")
+        new_url = self.fingerprint()["/index.css"]
+
+        self.assertNotEqual(old_url, new_url)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, old_url[1:])))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, new_url[1:])))
+
+    def test_rewrites_template_and_content(self):
+        urls.set_fingerprints({"/index.css": "/index.abc.css",
+                               "/images/tom.png": "/images/tom.abc.png"})
+        segments = templates.compile_template(
+            '<link href="/index.css" /><a href="/blog">{{ Content }}</a>', "/site/")
+        self.assertEqual(segments[0], '<link href="/site/index.abc.css" /><a href="/site/blog">')
+
+        markdown = "![Tom](/images/tom.png) and [home](/)"
+        expected = ('<div><p><img src="/site/images/tom.abc.png" alt="Tom"></img> and '
+                    '<a href="/site/">home</a></p></div>')
+        self.assertEqual(markdown_to_node.markdown_to_html(markdown, "/site/"), expected)
+        self.assertEqual(markdown_to_node.markdown_to_html_node(markdown, "/site/").to_html(),
+                         expected)
+
+    def test_block_cache_follows_fingerprints(self):
+        block = "![Tom](/images/tom.png)"
+        before = markdown_to_node.cached_block_to_html(block)
+        urls.set_fingerprints({"/images/tom.png": "/images/tom.abc.png"})
+        self.assertIn("tom.abc.png", markdown_to_node.cached_block_to_html(block))
+        urls.set_fingerprints(None)
+        self.assertEqual(markdown_to_node.cached_block_to_html(block), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,15 +2,28 @@
 
 '''We testing HTML'''
 
+import io
 import unittest
 
 # file was originally named "functions" and it's easier to do this than rename everything
 import markdown_to_node as functions
+import benchmark
 
 from blocktype import BlockType
 from htmlnode import LeafNode, ParentNode
 from textnode import TextNode, TextType
 
+
+def chained_text_to_text_nodes(text):
+    '''Reference for the lexer: the split_nodes_* passes applied one after another'''
+
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = functions.split_nodes_image(nodes)
+    nodes = functions.split_nodes_link(nodes)
+    nodes = functions.split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = functions.split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    return functions.split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+
 class TestFunction(unittest.TestCase):
 
     '''!!!!'''
@@ -219,6 +232,69 @@ class TestFunction(unittest.TestCase):
 
 
 
+    def test_text_to_text_nodes_delimiters_in_urls(self):
+        text = "A [link](https://a.com/snake_case) and ![img](/images/my_pic.png) _here_"
+
+        actual_output = functions.text_to_text_nodes(text)
+        expected_output = [
+            TextNode("A ", TextType.TEXT),
+            TextNode("link", TextType.LINK, "https://a.com/snake_case"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("img", TextType.IMAGE, "/images/my_pic.png"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("here", TextType.ITALIC),
+        ]
+
+        self.assertEqual(actual_output, expected_output)
+
+    def test_text_to_text_nodes_repeated_phrases(self):
+        text = "x`x`x and [a](b) then [a](c)"
+
+        actual_output = functions.text_to_text_nodes(text)
+        expected_output = [
+            TextNode("x", TextType.TEXT),
+            TextNode("x", TextType.CODE),
+            TextNode("x and ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "b"),
+            TextNode(" then ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "c"),
+        ]
+
+        self.assertEqual(actual_output, expected_output)
+
+    def test_text_to_text_nodes_odd_delimiter(self):
+        with self.assertRaises(ValueError):
+            functions.text_to_text_nodes("snake_case [link](https://a.com/x)")
+
+    def test_text_to_text_nodes_matches_chained_splits(self):
+        text = "A **bold** [link](u), ![i](v) and `co_de` then _it_ [l](w)"
+
+        self.assertEqual(functions.text_to_text_nodes(text),
+                         chained_text_to_text_nodes(text))
+
+    def test_benchmark_corpora_render(self):
+        for name in benchmark.CORPORA:
+            corpus = benchmark.make_corpus(name)
+            self.assertEqual(corpus, benchmark.make_corpus(name))
+            for markdown in corpus.values():
+                self.assertEqual(functions.markdown_to_html(markdown, "/site/"),
+                                 functions.markdown_to_html_node(markdown, "/site/").to_html())
+
+    def test_markdown_to_html_matches_tree(self):
+        for md in ("# T\n\n![i](/a.png) and [l](/b) with **b** _i_ `c`",
+                   "##  Odd spacing\n\n> q\n>\n> > n\n\n- a\n- ****\n\n3. x\n\n```\n`x`\n```"):
+            self.assertEqual(functions.markdown_to_html(md, "/site/"),
+                             functions.markdown_to_html_node(md, "/site/").to_html())
+
+    def test_markdown_to_html_errors_like_tree(self):
+        for md in ("", "# T\n\n>", "- a\n- \n- b", "odd **bold"):
+            with self.assertRaises(ValueError):
+                functions.markdown_to_html_node(md).to_html()
+            with self.assertRaises(ValueError):
+                functions.markdown_to_html(md)
+
+
+
     # markdown_to_blocks
     def test_markdown_to_blocks(self):
         md = """
@@ -243,6 +319,23 @@ This is the same paragraph on a new line
 
 
 
+    def test_iter_markdown_blocks_matches_markdown_to_blocks(self):
+        samples = [
+            "",
+            "\n\n  # Title  \n\n",
+            "# Title\n\nParagraph\nsame paragraph\n\n- a\n- b\n",
+            "a\n\n\nb\n\n\n\nc",
+            "a  \n\n   \n\nb\n\n \n",
+            "no trailing newline",
+        ]
+
+        for md in samples:
+            lines = io.StringIO(md)
+            self.assertEqual(list(functions.iter_markdown_blocks(lines)),
+                             functions.markdown_to_blocks(md))
+
+
+
     # block_to_block_type
     def test_block_to_block_type_heading(self):
         block = "### This is a header"
@@ -282,6 +375,23 @@ This is the same paragraph on a new line
 
         self.assertEqual(actual_result, BlockType.PARAGRAPH)
 
+    def test_classify_block_strips_markers(self):
+        self.assertEqual(functions.classify_block("> a\n>b\n>  c"),
+                         (BlockType.QUOTE, ["a", "b", "c"]))
+        self.assertEqual(functions.classify_block("- a\n- b"),
+                         (BlockType.UNORDERED_LIST, ["a", "b"]))
+        self.assertEqual(functions.classify_block("1. a\n2. b"),
+                         (BlockType.ORDERED_LIST, ["a", "b"]))
+        self.assertEqual(functions.classify_block("1. a\n3. b"), (BlockType.PARAGRAPH, None))
+        self.assertEqual(functions.classify_block("- a\n> b"), (BlockType.PARAGRAPH, None))
+        self.assertEqual(functions.classify_block("## h"), (BlockType.HEADING, None))
+
+    def test_block_to_node_matches_benchmark_legacy_router(self):
+        for block in ("> q\n> > nested", "- **a**\n- [l](/x)", "1. a\n2. _b_", "1. a\n3. b",
+                      "### h", "```\ncode\n```", "plain `text`"):
+            self.assertEqual(functions.block_to_node(block, "/site/"),
+                             benchmark.legacy_block_to_node(block, "/site/"))
+
 
     # markdown_to_html_node helpers
 
@@ -488,3 +598,13 @@ the **same** even with inline stuff
     #     node = functions.markdown_to_html_node(md)
     #     html = node.to_html()
     #     self.assertEqual(md, html)
+
+    def test_basepath_rebases_root_relative_urls(self):
+        md = "[home](/blog) and ![pic](/images/a.png) and [ext](https://x.com/)"
+
+        expected = ('<div><p><a href="/site/blog">home</a> and '
+                    '<img src="/site/images/a.png" alt="pic"></img> and '
+                    '<a href="https://x.com/">ext</a></p></div>')
+
+        node = functions.markdown_to_html_node(md, "/site/")
+        self.assertEqual(expected, node.to_html())
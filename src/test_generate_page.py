@@ -2,10 +2,14 @@
 
 '''We testing HTML'''
 
+import io
+import os
+import tempfile
 import unittest
 
 import generate_page
 import markdown_to_node
+import templates
 
 from blocktype import BlockType
 from htmlnode import LeafNode, ParentNode
@@ -30,3 +34,87 @@ class TestFunction(unittest.TestCase):
         self.assertEqual(header3, "Real header")
         with self.assertRaises(ValueError):
             generate_page.extract_title(markdown4)
+
+    def test_render_page(self):
+        template = templates.compile_template(
+            '<title>{{ Title }}</title><link href="/index.css">{{ Content }}', "/site/")
+        html = generate_page.render_page("/site/", "# Hi\n\n![x](/images/x.png)", template)
+
+        self.assertEqual(
+            html,
+            '<title>Hi</title><link href="/site/index.css">'
+            '<div><h1>Hi</h1><p><img src="/site/images/x.png" alt="x"></img></p></div>')
+
+    def test_stream_page_title_after_content(self):
+        template = templates.compile_template("<title>{{ Title }}</title>{{ Content }}")
+        stream = io.StringIO()
+        blocks = iter(["Intro", "# Late title", "Outro"])
+
+        generate_page.stream_page("/", blocks, template, stream)
+
+        self.assertEqual(
+            stream.getvalue(),
+            "<title>Late title</title><div><p>Intro</p><h1>Late title</h1><p>Outro</p></div>")
+
+    def test_build_page_from_file(self):
+        template = templates.compile_template("<title>{{ Title }}</title>{{ Content }}")
+        with tempfile.TemporaryDirectory() as tmp:
+            from_path = os.path.join(tmp, "page.md")
+            dest_path = os.path.join(tmp, "out", "page.html")
+            with open(from_path, 'w', encoding='utf-8') as f:
+                f.write("# Title\n\n" + "Lots of _words_\n\n" * 1000)
+
+            with open(from_path, 'r', encoding='utf-8') as source:
+                generate_page.build_page("/", source, template, dest_path)
+
+            with open(from_path, 'r', encoding='utf-8') as f:
+                expected = generate_page.render_page("/", f.read(), template)
+            with open(dest_path, 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_generate_pages_parallel_matches_serial(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, 'w', encoding='utf-8') as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            pages = []
+            for i in range(10):
+                from_path = os.path.join(tmp, f"page{i}.md")
+                with open(from_path, 'w', encoding='utf-8') as f:
+                    f.write(f"# Page {i}\n\nSome **bold** text")
+                pages.append((from_path, os.path.join(tmp, "serial", f"page{i}.html")))
+            parallel_pages = [(src, dest.replace("serial", "parallel")) for src, dest in pages]
+            # broken page: failure is reported, the rest of the build carries on
+            bad_path = os.path.join(tmp, "bad.md")
+            with open(bad_path, 'w', encoding='utf-8') as f:
+                f.write("no title")
+            parallel_pages.append((bad_path, os.path.join(tmp, "parallel", "bad.html")))
+
+            self.assertEqual(generate_page.generate_pages("/", pages, template_path), [])
+            failures = generate_page.generate_pages("/", parallel_pages, template_path, jobs=3)
+
+            self.assertEqual(
+                failures, [(bad_path, "ValueError: No toplevel header found in markdown")])
+            for (_, serial_dest), (_, parallel_dest) in zip(pages, parallel_pages):
+                with open(serial_dest, encoding='utf-8') as f1, \
+                        open(parallel_dest, encoding='utf-8') as f2:
+                    self.assertEqual(f1.read(), f2.read())
+
+    def test_parallel_workers_share_output_folders(self):
+        # every worker writes into the same nested folders, some of which already exist
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, 'w', encoding='utf-8') as f:
+                f.write("{{ Content }}")
+            os.makedirs(os.path.join(tmp, "out", "a"))
+            pages = []
+            for i in range(12):
+                from_path = os.path.join(tmp, f"page{i}.md")
+                with open(from_path, 'w', encoding='utf-8') as f:
+                    f.write(f"# Page {i}")
+                folder = ("a", "b", os.path.join("b", "c"))[i % 3]
+                pages.append((from_path, os.path.join(tmp, "out", folder, f"page{i}.html")))
+
+            self.assertEqual(generate_page.generate_pages("/", pages, template_path, jobs=4), [])
+            for _, dest_path in pages:
+                self.assertTrue(os.path.isfile(dest_path))
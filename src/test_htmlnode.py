@@ -2,6 +2,8 @@
 
 '''We testing HTMNodes'''
 
+import io
+import sys
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -122,3 +124,36 @@ class TestHTMLNode(unittest.TestCase):
         actual = str(parent_node)
 
         self.assertEqual(expected, actual)
+
+    def test_to_html_stream(self):
+        parent_node = ParentNode("div", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        stream = io.StringIO()
+
+        self.assertIsNone(parent_node.to_html(stream=stream))
+        self.assertEqual(stream.getvalue(), "<div><b>bold</b> text</div>")
+
+    def test_to_html_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "deep")
+        for _ in range(depth):
+            node = ParentNode("div", [node])
+
+        html = node.to_html()
+        self.assertEqual(html, "<div>" * depth + "deep" + "</div>" * depth)
+
+    def test_to_html_nested_no_children(self):
+        parent_node = ParentNode("div", [ParentNode("span", [])])
+        with self.assertRaises(ValueError):
+            parent_node.to_html()
+
+    def test_nodes_take_ownership(self):
+        children = [LeafNode("b", "bold")]
+        props = {"href": "https://www.google.com"}
+        parent_node = ParentNode("div", children)
+        leaf_node = LeafNode("a", "link", props)
+
+        self.assertIs(parent_node.children, children)
+        self.assertIs(leaf_node.props, props)
+        self.assertIsNone(ParentNode("div", []).children)
+        self.assertFalse(hasattr(leaf_node, "__dict__"))
+        self.assertFalse(hasattr(TextNode("text", TextType.TEXT), "__dict__"))
@@ -0,0 +1,102 @@
+# src/test_images.py
+
+'''We testing image dimensions and img attributes'''
+
+import contextlib
+import io
+import os
+import struct
+import unittest
+
+import images
+import markdown_to_node
+
+from fixtures import TempDirTestCase
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480)
+GIF = b"GIF89a" + struct.pack("<HH", 320, 200) + b"\x00" * 8
+WEBP_VP8 = (b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 7 + b"\x9d\x01\x2a"
+            + struct.pack("<HH", 800, 600) + b"\x00" * 4)
+WEBP_VP8L = (b"RIFF\x00\x00\x00\x00WEBPVP8L" + b"\x00" * 4 + b"\x2f"
+             + ((100 - 1) | (50 - 1) << 14).to_bytes(4, 'little') + b"\x00" * 8)
+WEBP_VP8X = (b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8
+             + (1920 - 1).to_bytes(3, 'little') + (1080 - 1).to_bytes(3, 'little') + b"\x00" * 4)
+# SOI, an APP0 segment to skip, fill bytes, then a baseline frame header
+JPEG = (b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+        + b"\xff\xff\xc0" + struct.pack(">HBHH", 17, 8, 768, 1024) + b"\x00" * 12)
+
+
+class TestImages(TempDirTestCase):
+
+    def tearDown(self):
+        images.set_dimensions(None)
+        images.set_variants({}, "")
+
+    def test_read_dimensions(self):
+        for name, data, expected in (
+            ("a.png", PNG, (640, 480)),
+            ("a.gif", GIF, (320, 200)),
+            ("a.webp", WEBP_VP8, (800, 600)),
+            ("b.webp", WEBP_VP8L, (100, 50)),
+            ("c.webp", WEBP_VP8X, (1920, 1080)),
+            ("a.jpg", JPEG, (1024, 768)),
+            ("bad.png", b"not an image", None),
+            ("cut.jpg", JPEG[:12], None),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(images.read_dimensions(self.write(name, data)), expected)
+
+    def test_scan_dimensions_caches_by_mtime(self):
+        static = os.path.join(self.root, "static")
+        os.makedirs(os.path.join(static, "images"))
+        cache_path = os.path.join(self.root, "images.json")
+        self.write(os.path.join("static", "images", "a.png"), PNG)
+        self.write(os.path.join("static", "images", "broken.gif"), b"GIF")
+        self.write(os.path.join("static", "index.css"), b"body {}")
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            dimensions = images.scan_dimensions(static, cache_path)
+            self.assertEqual(images.scan_dimensions(static, cache_path), dimensions)
+        self.assertEqual(dimensions, {"/images/a.png": (640, 480)})
+        self.assertIn("2 headers read", output.getvalue().splitlines()[0])
+        self.assertIn("0 headers read", output.getvalue().splitlines()[1])
+
+    def test_img_attributes(self):
+        markdown = "![Tom](/images/tom.png) ![Far](https://example.com/far.png)"
+        self.assertEqual(markdown_to_node.markdown_to_html(markdown),
+                         '<div><p><img src="/images/tom.png" alt="Tom"></img> '
+                         '<img src="https://example.com/far.png" alt="Far"></img></p></div>')
+
+        images.set_dimensions({"/images/tom.png": (928, 468)})
+        expected = ('<div><p><img src="/site/images/tom.png" alt="Tom" width="928" '
+                    'height="468" loading="lazy" decoding="async"></img> '
+                    '<img src="https://example.com/far.png" alt="Far" loading="lazy" '
+                    'decoding="async"></img></p></div>')
+        self.assertEqual(markdown_to_node.markdown_to_html(markdown, "/site/"), expected)
+        self.assertEqual(markdown_to_node.markdown_to_html_node(markdown, "/site/").to_html(),
+                         expected)
+        self.assertIn('width="928"', markdown_to_node.cached_block_to_html(markdown))
+
+    def test_keys_cover_only_the_images_shown(self):
+        key = markdown_to_node.image_settings_key
+        tom = "![Tom](/images/tom.png)"
+        self.assertFalse(images.is_enabled())
+        self.assertEqual(key(tom), "")
+
+        images.set_dimensions({"/images/tom.png": (928, 468)})
+        self.assertTrue(images.is_enabled())
+        self.assertEqual(key("No images here"), "")
+        tom_key = key(tom)
+
+        # another image being added or getting variants leaves tom's blocks and pages alone
+        images.set_dimensions({"/images/tom.png": (928, 468), "/images/new.png": (1, 1)})
+        images.set_variants({"/images/new.png": [(16, "/images/new-16w.png")]}, "100vw")
+        self.assertEqual(key(tom), tom_key)
+
+        images.set_dimensions({"/images/tom.png": (10, 10)})
+        self.assertNotEqual(key(tom), tom_key)
+
+
+if __name__ == "__main__":
+    unittest.main()
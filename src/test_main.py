@@ -0,0 +1,93 @@
+# src/test_main.py
+
+'''We testing the command line'''
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(SRC_DIR, "main.py")
+
+
+def run_python(args, cwd=SRC_DIR, stdin=None):
+    return subprocess.run([sys.executable] + args, cwd=cwd, input=stdin, capture_output=True,
+                          text=True, check=True)
+
+
+class TestMain(unittest.TestCase):
+
+    def make_site(self, tmp):
+        os.makedirs(os.path.join(tmp, "content", "blog"))
+        os.makedirs(os.path.join(tmp, "static"))
+        with open(os.path.join(tmp, "content", "index.md"), 'w', encoding='utf-8') as f:
+            f.write("# Home\n\nHello **world**")
+        with open(os.path.join(tmp, "content", "blog", "post.md"), 'w', encoding='utf-8') as f:
+            f.write("# Post\n\n- one\n- two")
+        with open(os.path.join(tmp, "static", "index.css"), 'w', encoding='utf-8') as f:
+            f.write("body {}")
+        with open(os.path.join(tmp, "template.html"), 'w', encoding='utf-8') as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def test_main_imports_pipeline_lazily(self):
+        run_python(["-c", "import main, sys; "
+                          "assert 'generate_page' not in sys.modules, 'eager import'; "
+                          "assert 'markdown_to_node' not in sys.modules, 'eager import'"])
+
+    def test_renderer_imports_no_build_steps(self):
+        run_python(["-c", "import markdown_to_node, sys; "
+                          "assert 'copy_static' not in sys.modules, 'eager import'; "
+                          "assert 'manifest' not in sys.modules, 'eager import'"])
+
+    def test_noop_incremental_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.make_site(tmp)
+            run_python([MAIN, "build", "--incremental"], cwd=tmp)
+
+            output = run_python([MAIN, "--incremental"], cwd=tmp).stdout
+            self.assertIn("0 generated, 2 unchanged", output)
+
+    def test_full_build_keeps_unchanged_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.make_site(tmp)
+            run_python([MAIN, "build"], cwd=tmp)
+            page = os.path.join(tmp, "docs", "blog", "post.html")
+            stale = os.path.join(tmp, "docs", "blog", "stale.html")
+            with open(stale, 'w', encoding='utf-8') as f:
+                f.write("left over")
+            mtime = os.stat(page).st_mtime_ns
+
+            output = run_python([MAIN, "build"], cwd=tmp).stdout
+            self.assertIn("0 written, 2 unchanged", output)
+            self.assertEqual(os.stat(page).st_mtime_ns, mtime)
+            self.assertFalse(os.path.exists(stale))
+
+    def test_profile_rejects_other_build_modes(self):
+        for flags in (["--incremental"], ["--jobs", "2"], ["--cache"]):
+            with self.subTest(flags=flags):
+                process = subprocess.run([sys.executable, MAIN, "build", "--profile"] + flags,
+                                         cwd=SRC_DIR, capture_output=True, text=True)
+                self.assertEqual(process.returncode, 2)
+                self.assertIn(f"--profile can't be combined with {flags[0]}", process.stderr)
+
+    def test_render_one(self):
+        html = run_python([MAIN, "render-one", "--fragment", "--basepath", "/site/"],
+                          stdin="# Hi\n\n[home](/)").stdout
+        self.assertEqual(html, '<div><h1>Hi</h1><p><a href="/site/">home</a></p></div>')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.make_site(tmp)
+            page = run_python([MAIN, "render-one", "content/index.md"], cwd=tmp).stdout
+        self.assertEqual(page, "<title>Home</title><div><h1>Home</h1>"
+                               "<p>Hello <b>world</b></p></div>")
+
+    def test_render_one_error(self):
+        with self.assertRaises(subprocess.CalledProcessError) as error:
+            run_python([MAIN, "render-one", "--fragment"], stdin="unclosed **bold")
+        self.assertIn("!!!", error.exception.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+# src/test_manifest.py
+
+'''We testing incremental builds'''
+
+import os
+import unittest
+
+import generate_page
+import manifest
+import minify
+
+from fixtures import TempDirTestCase
+
+TEMPLATE = "<title>{{ Title }}</title><article>{{ Content }}</article>"
+
+
+class TestIncrementalBuild(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".cache", "manifest.json")
+
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nWords")
+
+    def build(self, basepath="/", jobs=1):
+        generated, unchanged, removed, failures = generate_page.generate_pages_incremental(
+            basepath, self.content, self.template, self.dest, self.manifest, jobs)
+        self.assertEqual(failures, [])
+        return generated, unchanged, removed
+
+    def test_find_pages(self):
+        pages = generate_page.find_pages(self.content, self.dest)
+        expected = [
+            (os.path.join(self.content, "blog", "post.md"),
+             os.path.join(self.dest, "blog", "post.html")),
+            (os.path.join(self.content, "index.md"),
+             os.path.join(self.dest, "index.html")),
+        ]
+
+        self.assertEqual(pages, expected)
+
+    def test_second_build_skips_everything(self):
+        self.assertEqual(self.build(), (2, 0, 0))
+        self.assertEqual(self.build(), (0, 2, 0))
+
+    def test_changed_source_regenerates_one_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+
+        self.assertEqual(self.build(), (1, 1, 0))
+        with open(os.path.join(self.dest, "index.html"), encoding='utf-8') as f:
+            self.assertIn("Changed", f.read())
+
+    def test_template_and_basepath_changes_regenerate(self):
+        self.build()
+        self.write(self.template, TEMPLATE + "\n")
+        self.assertEqual(self.build(), (2, 0, 0))
+        # neither page nor the template has a root-relative link for basepath to change
+        self.assertEqual(self.build("/site/"), (0, 2, 0))
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.assertEqual(self.build("/site/"), (1, 1, 0))
+        self.assertEqual(self.build("/other/"), (1, 1, 0))
+        self.write(self.template, '<a href="/">home</a>' + TEMPLATE)
+        self.assertEqual(self.build("/other/"), (2, 0, 0))
+
+    def test_minify_change_regenerates(self):
+        self.build()
+        index = os.path.join(self.content, "index.md")
+        self.assertIsNone(manifest.load_manifest(self.manifest)[index]["minified"])
+
+        minify.set_enabled(True)
+        try:
+            # the template has no whitespace to minify, so only the entry flags the change
+            self.assertEqual(self.build(), (2, 0, 0))
+            self.assertTrue(manifest.load_manifest(self.manifest)[index]["minified"])
+            self.assertEqual(self.build(), (0, 2, 0))
+        finally:
+            minify.set_enabled(False)
+        self.assertEqual(self.build(), (2, 0, 0))
+
+    def test_missing_output_regenerates(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+
+        self.assertEqual(self.build(), (1, 1, 0))
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+
+        self.assertEqual(self.build(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+        self.assertNotIn(os.path.join(self.content, "blog", "post.md"),
+                         manifest.load_manifest(self.manifest))
+
+    def test_parallel_incremental_build(self):
+        self.assertEqual(self.build(jobs=2), (2, 0, 0))
+        self.assertEqual(self.build(jobs=2), (0, 2, 0))
+
+    def test_failed_page_is_retried(self):
+        bad_page = os.path.join(self.content, "bad.md")
+        self.write(bad_page, "no title here")
+        result = generate_page.generate_pages_incremental(
+            "/", self.content, self.template, self.dest, self.manifest)
+
+        self.assertEqual(result[3][0][0], bad_page)
+        self.assertNotIn(bad_page, manifest.load_manifest(self.manifest))
+
+        self.write(bad_page, "# Fixed")
+        self.assertEqual(self.build(), (1, 2, 0))
+
+    def test_corrupt_manifest_means_full_rebuild(self):
+        self.build()
+        self.write(self.manifest, "{not json")
+
+        self.assertEqual(self.build(), (2, 0, 0))
+
+    def test_save_manifest_into_existing_folder(self):
+        path = os.path.join(self.root, "records", "nested", "records.json")
+        os.makedirs(os.path.dirname(path))
+        manifest.save_manifest(path, {"a": 1})
+        manifest.save_manifest(path, {"a": 2})
+        self.assertEqual(manifest.load_manifest(path), {"a": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
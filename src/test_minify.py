@@ -0,0 +1,64 @@
+# src/test_minify.py
+
+'''We testing HTML minification'''
+
+import unittest
+
+import generate_page
+import minify
+import templates
+
+
+class TestMinify(unittest.TestCase):
+
+    def tearDown(self):
+        minify.set_enabled(False)
+
+    def test_collapses_whitespace(self):
+        html = "<div>\n  <p>one\n   two <b>bold</b> <i>it</i>  </p>\n</div>"
+        self.assertEqual(minify.minify_html(html),
+                         "<div><p>one two <b>bold</b> <i>it</i></p></div>")
+
+    def test_preserves_code(self):
+        html = ("<div> <pre><code>def f():\n    return  1\n</code></pre>\n"
+                "<p>run <code>a  b</code> now</p> </div>")
+        self.assertEqual(minify.minify_html(html),
+                         "<div><pre><code>def f():\n    return  1\n</code></pre>"
+                         "<p>run <code>a  b</code> now</p></div>")
+
+    def test_preserves_quoted_attribute_values(self):
+        html = ('<p>see\n  <img  src="/a.png"\n  alt="two  spaces" title=\'line\n  break\'>'
+                '  <a href="/b" title="x > y  z">b  c</a></p>')
+        self.assertEqual(minify.minify_html(html),
+                         '<p>see <img src="/a.png" alt="two  spaces" title=\'line\n  break\'> '
+                         '<a href="/b" title="x > y  z">b c</a></p>')
+
+    def test_keeps_non_breaking_spaces(self):
+        self.assertEqual(minify.minify_html("<p>a\u00a0\u00a0b</p>"), "<p>a\u00a0\u00a0b</p>")
+
+    def test_minified_template(self):
+        template = ('<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n'
+                    '    <link href="/index.css" rel="stylesheet" />\n  </head>\n'
+                    '  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>')
+        segments = templates.compile_template(template, "/site/", minified=True)
+        self.assertEqual(segments, [
+            '<!doctype html><html><head><title>', 'Title',
+            '</title><link href="/site/index.css" rel="stylesheet" /></head><body><article>',
+            'Content', '</article></body></html>'])
+        self.assertEqual(templates.compile_template(template, "/site/")[1::2],
+                         ["Title", "Content"])
+
+    def test_minified_page_counts_saved_bytes(self):
+        minify.set_enabled(True)
+        template = ["<article>", "Content", "</article>"]
+        markdown = "# Title\n\nline one\n   line   two\n\n```\nkeep   this\n```"
+        saved_bytes = minify.saved_bytes
+
+        html = generate_page.render_page("/", markdown, template)
+        self.assertEqual(html, "<article><div><h1>Title</h1><p>line one line two</p>"
+                               "<pre><code>keep   this\n</code></pre></div></article>")
+        self.assertEqual(minify.saved_bytes - saved_bytes, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# src/test_output_writer.py
+
+'''We testing the output writer'''
+
+import os
+import unittest
+
+import output_writer
+
+from fixtures import TempDirTestCase
+
+
+class TestOutputWriter(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dest_path = os.path.join(self.root, "blog", "post", "index.html")
+        self.writer = output_writer.OutputWriter()
+
+    def test_skips_identical_output(self):
+        self.writer.write(self.dest_path, "<p>one</p>")
+        os.utime(self.dest_path, ns=(0, 0))
+
+        self.writer.write(self.dest_path, "<p>one</p>")
+        self.assertEqual(os.stat(self.dest_path).st_mtime_ns, 0)
+
+        self.writer.write(self.dest_path, "<p>two</p>")
+        self.assertEqual(self.read(self.dest_path), "<p>two</p>")
+        self.assertNotEqual(os.stat(self.dest_path).st_mtime_ns, 0)
+        self.assertEqual((self.writer.written, self.writer.unchanged), (2, 1))
+        self.assertEqual(os.listdir(os.path.dirname(self.dest_path)), ["index.html"])
+
+    def test_failed_write_keeps_old_output(self):
+        self.writer.write(self.dest_path, "<p>old</p>")
+
+        with self.assertRaises(ValueError):
+            with self.writer.open(self.dest_path) as f:
+                f.write("<p>half a page")
+                raise ValueError("No toplevel header found in markdown")
+
+        self.assertEqual(self.read(self.dest_path), "<p>old</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.dest_path)), ["index.html"])
+
+    def test_make_dirs_once(self):
+        dest_dir = os.path.dirname(self.dest_path)
+        self.writer.make_dirs([dest_dir, dest_dir])
+
+        self.assertTrue(os.path.isdir(dest_dir))
+        self.assertEqual(self.writer.dirs, {dest_dir})
+
+
+if __name__ == "__main__":
+    unittest.main()
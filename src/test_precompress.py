@@ -0,0 +1,69 @@
+# src/test_precompress.py
+
+'''We testing gzip sidecar generation'''
+
+import contextlib
+import gzip
+import io
+import os
+import unittest
+
+import precompress
+
+from fixtures import TempDirTestCase
+
+
+class TestPrecompress(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.docs = os.path.join(self.root, "docs")
+        self.cache_dir = os.path.join(self.root, "gzip")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.page = "<p>" + "hello world " * 100 + "</p>"
+        self.write(os.path.join("docs", "blog", "index.html"), self.page)
+        self.write(os.path.join("docs", "index.css"), "body { margin: 0 }\n" * 50)
+        self.write(os.path.join("docs", "tiny.css"), "a {}")
+        self.write(os.path.join("docs", "tom.png"), "not really a png " * 50)
+
+    def precompress(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return precompress.precompress_tree(self.docs, self.cache_dir)
+
+    def test_writes_sidecars_for_compressible_files(self):
+        self.assertEqual(self.precompress(), (2, 0, 0, 0))
+
+        with gzip.open(os.path.join(self.docs, "blog", "index.html.gz"), 'rt') as f:
+            self.assertEqual(f.read(), self.page)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tom.png.gz")))
+
+    def test_skips_unchanged_and_reuses_cache(self):
+        self.precompress()
+        self.assertEqual(self.precompress(), (0, 0, 2, 0))
+
+        # rewritten with the same bytes (as after copy_static wipes docs/): no recompression
+        os.remove(os.path.join(self.docs, "index.css.gz"))
+        self.write(os.path.join("docs", "index.css"), "body { margin: 0 }\n" * 50)
+        self.assertEqual(self.precompress(), (0, 1, 1, 0))
+
+        self.write(os.path.join("docs", "index.css"), "body { margin: 1px }\n" * 50)
+        self.assertEqual(self.precompress(), (1, 0, 1, 0))
+
+    def test_removes_orphaned_sidecars_only(self):
+        self.write(os.path.join("docs", "archive.gz"), "shipped as is")
+        self.precompress()
+        os.remove(os.path.join(self.docs, "index.css"))
+
+        self.assertEqual(self.precompress(), (0, 0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "archive.gz")))
+
+    def test_output_is_deterministic(self):
+        data = self.page.encode('utf-8')
+        self.assertEqual(precompress.gzip_bytes(data), precompress.gzip_bytes(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# src/test_profiler.py
+
+'''We testing the build profiler'''
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import generate_page
+import minify
+import profiler
+import templates
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3]
+
+        self.assertEqual(profiler.percentile(values, 50), 3)
+        self.assertEqual(profiler.percentile(values, 95), 5)
+        self.assertEqual(profiler.percentile([7], 50), 7)
+        self.assertEqual(profiler.percentile([], 95), 0)
+
+    def test_profile_build_matches_normal_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(os.path.join(content, "blog"))
+            pages = {"index.md": "# Home\n\nSee [post](/blog/post)",
+                     os.path.join("blog", "post.md"): "# Post\n\n- a\n- **b**\n\n```\ncode\n```"}
+            for rel_path, markdown in pages.items():
+                with open(os.path.join(content, rel_path), 'w', encoding='utf-8') as f:
+                    f.write(markdown)
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, 'w', encoding='utf-8') as f:
+                f.write('<title>{{ Title }}</title><a href="/">{{ Content }}</a>')
+            dump_path = os.path.join(tmp, "build.prof")
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                failures = profiler.profile_build(
+                    "/site/", content, template_path, os.path.join(tmp, "docs"),
+                    dump_path=dump_path)
+
+            self.assertEqual(failures, [])
+            self.assertTrue(os.path.isfile(dump_path))
+            for stage in profiler.STAGES:
+                self.assertIn(f"\n{stage} ", output.getvalue())
+
+            template = templates.load_template(template_path, "/site/")
+            for rel_path, markdown in pages.items():
+                with open(os.path.join(tmp, "docs", f"{rel_path[:-3]}.html"),
+                          'r', encoding='utf-8') as f:
+                    self.assertEqual(f.read(),
+                                     generate_page.render_page("/site/", markdown, template))
+
+    def test_profile_build_minifies(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            markdown = "# Home\n\nline one\n   line   two"
+            with open(os.path.join(content, "index.md"), 'w', encoding='utf-8') as f:
+                f.write(markdown)
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, 'w', encoding='utf-8') as f:
+                f.write("<title>{{ Title }}</title>\n  <main>{{ Content }}</main>")
+
+            minify.set_enabled(True)
+            try:
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    failures = profiler.profile_build("/", content, template_path,
+                                                      os.path.join(tmp, "docs"),
+                                                      track_allocations=False)
+                template = templates.load_template(template_path)
+                expected = generate_page.render_page("/", markdown, template)
+            finally:
+                minify.set_enabled(False)
+
+            self.assertEqual(failures, [])
+            self.assertIn(">>> Minify: 8 bytes saved over 1 pages", output.getvalue())
+            with open(os.path.join(tmp, "docs", "index.html"), 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), expected)
+            self.assertIn("line one line two", expected)
+
+    def test_stage_accumulates(self):
+        build_profiler = profiler.BuildProfiler(track_allocations=False)
+        build_profiler.start_page("a.md")
+        with build_profiler.stage("inline"):
+            pass
+        with build_profiler.stage("inline"):
+            pass
+
+        _, times, allocations = build_profiler.pages[0]
+        self.assertGreater(times["inline"], 0)
+        self.assertEqual(times["read"], 0)
+        self.assertEqual(allocations["inline"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
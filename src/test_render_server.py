@@ -0,0 +1,95 @@
+# src/test_render_server.py
+
+'''We testing the render daemon'''
+
+import os
+import socket
+import threading
+import unittest
+
+import generate_page
+import markdown_to_node
+import render_server
+import templates
+
+from fixtures import TempDirTestCase
+
+
+class TestRenderServer(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.template_path = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.socket_path = os.path.join(self.root, "render.sock")
+        self.server = render_server.RenderServer(self.socket_path, self.template_path,
+                                                 "/site/", workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_render_requests(self):
+        markdown = "# Hi\n\n[home](/) and **bold**"
+        responses = render_server.send_requests(self.socket_path, [
+            {"id": 1, "markdown": markdown},
+            {"id": 2, "markdown": markdown, "page": False},
+            {"id": 3, "markdown": "odd **bold"},
+            {"op": "stats"},
+        ])
+
+        template = templates.load_template(self.template_path, "/site/")
+        self.assertEqual(responses[0]["html"],
+                         generate_page.render_page("/site/", markdown, template))
+        self.assertEqual(responses[1]["html"],
+                         markdown_to_node.markdown_to_html_node(markdown, "/site/").to_html())
+        self.assertEqual([response["id"] for response in responses[:3]], [1, 2, 3])
+        self.assertIsNone(responses[2]["html"])
+        self.assertIn("ValueError", responses[2]["error"])
+        self.assertGreaterEqual(responses[0]["render_ms"], 0)
+        self.assertEqual((responses[3]["count"], responses[3]["errors"]), (3, 1))
+
+    def test_bad_request_keeps_connection(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            with client.makefile('rwb') as stream:
+                stream.write(b"not json\n[1]\n")
+                stream.flush()
+                self.assertIn(b"bad request", stream.readline())
+                self.assertIn(b"bad request", stream.readline())
+
+        response, = render_server.send_requests(self.socket_path,
+                                                [{"markdown": "# Still up"}])
+        self.assertIn("<h1>Still up</h1>", response["html"])
+
+    def test_close_removes_socket(self):
+        self.assertTrue(os.path.exists(self.socket_path))
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_live_socket_is_not_replaced(self):
+        with self.assertRaises(FileExistsError):
+            render_server.RenderServer(self.socket_path, self.template_path)
+        response, = render_server.send_requests(self.socket_path, [{"markdown": "# Up"}])
+        self.assertIn("<h1>Up</h1>", response["html"])
+
+    def test_stale_socket_is_replaced(self):
+        # bound, then closed without unlinking: what a crashed server leaves behind
+        stale_path = os.path.join(self.root, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(stale_path)
+        server = render_server.RenderServer(stale_path, self.template_path, workers=1)
+        server.server_close()
+
+    def test_other_file_is_not_removed(self):
+        path = self.write("notes.txt", "keep me")
+        with self.assertRaises(FileExistsError):
+            render_server.RenderServer(path, self.template_path)
+        self.assertEqual(self.read("notes.txt"), "keep me")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+# src/test_responsive.py
+
+'''We testing responsive image variants'''
+
+import contextlib
+import io
+import os
+import random
+import unittest
+
+import depgraph
+import images
+import markdown_to_node
+import responsive
+
+from fixtures import TempDirTestCase
+
+
+def noisy_pixels(width, height, bpp, seed=0):
+    rng = random.Random(seed)
+    return bytearray(rng.randrange(256) for _ in range(width * height * bpp))
+
+
+class TestPNG(TempDirTestCase):
+
+    def test_round_trip(self):
+        for color_type, bpp in responsive.PNG_CHANNELS.items():
+            with self.subTest(color_type=color_type):
+                pixels = noisy_pixels(7, 5, bpp, seed=color_type)
+                path = self.write(f"{color_type}.png",
+                                  responsive.encode_png(7, 5, color_type, pixels))
+                self.assertEqual(responsive.read_png(path), (7, 5, color_type, pixels))
+
+    def test_unfilter(self):
+        # row 0 unfiltered, then Sub, Up, Average and Paeth rows; 1 byte per pixel
+        data = bytes([0, 10, 20, 1, 5, 5, 2, 1, 1, 3, 5, 5, 4, 5, 5])
+        self.assertEqual(responsive.unfilter(data, 2, 5, 1),
+                         bytearray([10, 20, 5, 10, 6, 11, 8, 14, 13, 19]))
+
+    def test_rejects_unsupported_png(self):
+        header = responsive.png_chunk(b"IHDR", bytes.fromhex("00000002000000020803000000"))
+        path = self.write("palette.png", responsive.PNG_SIGNATURE + header)
+        with self.assertRaises(ValueError):
+            responsive.read_png(path)
+
+    def test_resize_averages_blocks(self):
+        # 4x2 grayscale, downscaled to 2x1: each output pixel averages a 2x2 block
+        pixels = bytearray([0, 10, 100, 200, 20, 30, 100, 100])
+        self.assertEqual(responsive.resize(4, 2, 1, pixels, 2), (1, bytearray([15, 125])))
+
+    def test_parse_widths(self):
+        self.assertEqual(responsive.parse_widths("800, 400,800"), (400, 800))
+        for text in ("", "big", "0,400"):
+            with self.assertRaises(ValueError):
+                responsive.parse_widths(text)
+
+
+class TestBuildVariants(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.cache_dir = os.path.join(self.root, "variants")
+        self.write(os.path.join("content", "index.md"),
+                   "# Hi\n\n![Noise](/images/noise.png)\n\n![Away](/images/missing.png)\n\n"
+                   "```\n![Code](/images/code.png)\n```")
+        self.write(os.path.join("static", "images", "noise.png"),
+                   responsive.encode_png(64, 32, 2, noisy_pixels(64, 32, 3)))
+
+    def tearDown(self):
+        images.set_variants({}, "")
+
+    def build(self, widths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return responsive.build_variants(self.content, self.static, self.docs,
+                                             self.cache_dir, widths)
+
+    def test_variants_are_produced_once(self):
+        variants = self.build((16, 32, 64))
+        urls = variants["/images/noise.png"]
+        self.assertEqual([width for width, _ in urls], [16, 32, 64])
+        self.assertEqual(urls[-1], (64, "/images/noise.png"))
+        self.assertEqual(list(variants), ["/images/noise.png"])
+
+        small_path = os.path.join(self.docs, urls[0][1].lstrip("/"))
+        self.assertEqual(responsive.read_png(small_path)[:3], (16, 8, 2))
+        mtime = os.stat(small_path).st_mtime_ns
+        self.assertEqual(self.build((16, 32, 64)), variants)
+        self.assertEqual(os.stat(small_path).st_mtime_ns, mtime)
+
+        # dropping a width removes its published copy
+        self.build((32,))
+        self.assertFalse(os.path.exists(small_path))
+
+    def test_recorded_images_reused(self):
+        index = os.path.join(self.content, "index.md")
+        noise = os.path.join(self.static, "images", "noise.png")
+        self.assertEqual(responsive.referenced_images(self.content, self.static),
+                         {"/images/noise.png": noise})
+
+        # an unchanged page isn't read again: the images its manifest entry records are used
+        old_pages = {index: dict(depgraph.read_page(index), images=[])}
+        self.assertEqual(responsive.referenced_images(self.content, self.static, old_pages), {})
+
+    def test_srcset(self):
+        images.set_variants(self.build((16, 32)), "100vw")
+        html = markdown_to_node.markdown_to_html("![Noise](/images/noise.png)", "/site/")
+        srcset = ", ".join(f"/site{url} {width}w"
+                           for width, url in images.get_settings()[1]["/images/noise.png"])
+        self.assertEqual(html, f'<div><p><img src="/site/images/noise.png" alt="Noise" '
+                               f'srcset="{srcset}" sizes="100vw"></img></p></div>')
+        self.assertEqual(
+            markdown_to_node.markdown_to_html_node("![Noise](/images/noise.png)",
+                                                   "/site/").to_html(), html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# src/test_templates.py
+
+'''We testing templates'''
+
+import os
+import tempfile
+import unittest
+
+import templates
+
+
+class TestTemplates(unittest.TestCase):
+
+    def test_compile_template(self):
+        segments = templates.compile_template(
+            '<link href="/index.css"><title>{{ Title }}</title><img src="/a.png">{{ Content }}!',
+            "/site/")
+
+        self.assertEqual(
+            segments,
+            ['<link href="/site/index.css"><title>', "Title",
+             '</title><img src="/site/a.png">', "Content", "!"])
+
+    def test_render_template(self):
+        segments = templates.compile_template("<h1>{{ Title }}</h1>{{ Content }}{{ Footer }}")
+        html = templates.render_template(
+            segments, Title="Hi", Content='<a href="/x">link</a>')
+
+        # generated content is not rewritten, unknown placeholders are left alone
+        self.assertEqual(html, '<h1>Hi</h1><a href="/x">link</a>{{ Footer }}')
+
+    def test_load_template_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("<p>{{ Content }}</p>")
+
+            first = templates.load_template(path)
+            self.assertIs(templates.load_template(path), first)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("<div>{{ Content }}</div>")
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+            self.assertEqual(templates.load_template(path), ["<div>", "Content", "</div>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
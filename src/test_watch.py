@@ -0,0 +1,133 @@
+# src/test_watch.py
+
+'''We testing watch mode'''
+
+import functools
+import os
+import threading
+import unittest
+import urllib.request
+
+from http.server import ThreadingHTTPServer
+
+import copy_static
+import watch
+
+from fixtures import TempDirTestCase
+
+
+class TestSiteWatcher(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        for path in (self.content, self.static, self.dest):
+            os.makedirs(path)
+
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.watcher = watch.SiteWatcher(
+            "/", self.content, self.static, self.template, self.dest)
+
+    def write(self, path, text, mtime_ns=None):
+        path = super().write(path, text)
+        # bump mtime explicitly; filesystem timestamps can be coarse
+        mtime_ns = mtime_ns or os.stat(path).st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_no_changes(self):
+        self.assertFalse(self.watcher.poll())
+
+    def test_page_added_changed_removed(self):
+        page = os.path.join(self.content, "blog", "post.md")
+        os.makedirs(os.path.dirname(page))
+        self.write(page, "# Post")
+        self.assertTrue(self.watcher.poll())
+        dest_path = os.path.join(self.dest, "blog", "post.html")
+        self.assertEqual(self.read(dest_path), "<title>Post</title><div><h1>Post</h1></div>")
+
+        self.write(page, "# Edited")
+        self.assertTrue(self.watcher.poll())
+        self.assertIn("Edited", self.read(dest_path))
+        # only the edited page was rebuilt
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html")))
+
+        os.remove(page)
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(os.path.exists(dest_path))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.template, "<h2>{{ Title }}</h2>")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(self.read(os.path.join(self.dest, "index.html")), "<h2>Home</h2>")
+
+    def test_static_change(self):
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body {}")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body {}")
+
+        os.remove(css)
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_static_change_with_hardlinked_assets(self):
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body {}")
+        copy_static.sync_static(self.static, self.dest, os.path.join(self.root, "static.json"),
+                                hardlink=True)
+        dest_css = os.path.join(self.dest, "index.css")
+        self.assertTrue(os.path.samefile(css, dest_css))
+
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(self.read(css), "body {}")
+        self.assertEqual(self.read(dest_css), "body {}")
+
+        self.write(css, "body { margin: 0 }")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(self.read(css), "body { margin: 0 }")
+        self.assertEqual(self.read(dest_css), "body { margin: 0 }")
+
+    def test_broken_page_does_not_stop_watcher(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        self.assertTrue(self.watcher.poll())
+
+
+class QuietHandler(watch.DevRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDevServer(TempDirTestCase):
+
+    def test_serves_html_with_live_reload(self):
+        self.write("index.html", "<body><p>hi</p></body>")
+        self.write("index.css", "body {}")
+
+        notifier = watch.ReloadNotifier()
+        handler = functools.partial(QuietHandler, directory=self.root, notifier=notifier)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/") as response:
+                self.assertEqual(response.read().decode(),
+                                 f"<body><p>hi</p>{watch.LIVE_RELOAD_SCRIPT}</body>")
+            with urllib.request.urlopen(f"{base}/index.css") as response:
+                self.assertEqual(response.read(), b"body {}")
+
+            with urllib.request.urlopen(f"{base}{watch.LIVE_RELOAD_PATH}") as events:
+                notifier.notify()
+                self.assertEqual(events.readline(), b"data: reload\n")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,6 +24,8 @@ class TextNode():
     '''For handling of web text
     Formatting concerns are stored as object properties'''
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type # TextType.NAME
@@ -0,0 +1,45 @@
+# src/urls.py
+
+'''
+Rewriting of root-relative URLs, shared by the template compiler and both renderers.
+
+URLs are pointed at the site's basepath and, when the build fingerprints its assets
+(see fingerprint), at the content-hashed copy of the static file they name. The
+fingerprint map is set once per build; anything that caches rewritten output includes
+fingerprints_key() in its cache key.
+'''
+
+import hashlib
+
+# "/index.css" -> "/index.1a2b3c4d.css" for the current build (empty: no fingerprinting)
+_fingerprints = {}
+_fingerprints_key = ""
+
+
+def set_fingerprints(fingerprints):
+    '''Makes rebase_url use fingerprints ({asset URL: fingerprinted URL}, or None to stop)'''
+
+    global _fingerprints, _fingerprints_key
+    _fingerprints = dict(fingerprints or {})
+    if _fingerprints:
+        pairs = "\0".join(f"{url}\0{fingerprinted}"
+                          for url, fingerprinted in sorted(_fingerprints.items()))
+        _fingerprints_key = hashlib.sha256(pairs.encode('utf-8')).hexdigest()
+    else:
+        _fingerprints_key = ""
+
+def get_fingerprints():
+    return dict(_fingerprints)
+
+def fingerprints_key():
+    '''Hash of the current fingerprint map ("" when there is none)'''
+
+    return _fingerprints_key
+
+def rebase_url(url, basepath):
+    '''Points root-relative URLs ("/images/x.png") at their fingerprinted copy and the basepath'''
+
+    url = _fingerprints.get(url, url)
+    if basepath != "/" and url.startswith("/"):
+        return basepath + url[1:]
+    return url
@@ -0,0 +1,224 @@
+# src/watch.py
+
+'''
+Watch mode: keeps the parser and compiled template warm in one long-lived process,
+polls content/, static/ and the template for changes, rebuilds only what changed,
+and serves docs/ with live reload.
+'''
+
+import functools
+import os
+import threading
+import time
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import copy_static
+import generate_page
+import templates
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+                      '.onmessage = () => location.reload();</script>')
+
+
+def snapshot(path):
+    '''Returns {file path: mtime_ns} for a single file or every file in a directory tree'''
+
+    if os.path.isfile(path):
+        return {path: os.stat(path).st_mtime_ns}
+
+    files = {}
+    for dir_path, _, file_names in os.walk(path):
+        for name in file_names:
+            file_path = os.path.join(dir_path, name)
+            try:
+                files[file_path] = os.stat(file_path).st_mtime_ns
+            except OSError:
+                continue  # deleted between walk and stat
+    return files
+
+def diff_snapshots(old, new):
+    '''Returns (changed or added paths, removed paths), both sorted'''
+
+    changed = sorted(path for path, mtime in new.items() if old.get(path) != mtime)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+class ReloadNotifier():
+
+    '''Build counter that live reload connections wait on'''
+
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        '''Blocks until the version moves past version (or timeout), returns the current one'''
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+
+    '''Static file handler that injects the live reload script into HTML pages'''
+
+    def __init__(self, *args, notifier=None, **kwargs):
+        self.notifier = notifier
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url_path = self.path.split("?", 1)[0]
+        if url_path == LIVE_RELOAD_PATH:
+            self.stream_reload_events()
+            return
+
+        path = self.translate_path(url_path)
+        if url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+
+        with open(path, 'rb') as f:
+            html = f.read().decode('utf-8')
+        if "</body>" in html:
+            html = html.replace("</body>", f"{LIVE_RELOAD_SCRIPT}</body>", 1)
+        else:
+            html += LIVE_RELOAD_SCRIPT
+        body = html.encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reload_events(self):
+        '''Server-sent events: one "reload" message after the next rebuild'''
+
+        # read before answering, so a rebuild racing the handshake isn't missed
+        version = self.notifier.version
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        try:
+            while True:
+                new_version = self.notifier.wait(version, timeout=15)
+                if new_version != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    self.wfile.flush()
+                    return
+                # keepalive comment, also how we notice the tab went away
+                self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+class SiteWatcher():
+
+    '''Snapshots of the watched inputs plus the targeted rebuild logic'''
+
+    def __init__(self, basepath, content_dir, static_dir, template_path, dest_dir):
+        self.basepath = basepath
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+
+        self.content = snapshot(content_dir)
+        self.static = snapshot(static_dir)
+        self.template = snapshot(template_path)
+
+    def page_dest(self, from_path):
+        rel_path = os.path.relpath(from_path, self.content_dir)
+        return os.path.join(self.dest_dir, f'{rel_path[:-3]}.html')
+
+    def build(self, from_path):
+        '''Rebuilds one page; errors are printed so a typo doesn't stop the watcher'''
+
+        dest_path = self.page_dest(from_path)
+        print(f">>> Rebuilding {dest_path}")
+        try:
+            template = templates.load_template(self.template_path, self.basepath)
+            generate_page.build_page_file(self.basepath, from_path, template, dest_path)
+        except Exception as e:
+            print(f"!!! {from_path}: {type(e).__name__}: {e}")
+
+    def poll(self):
+        '''Checks every input once and rebuilds what changed. Returns True if anything did.'''
+
+        content, static, template = (
+            snapshot(self.content_dir), snapshot(self.static_dir), snapshot(self.template_path))
+        content_changed, content_removed = diff_snapshots(self.content, content)
+        static_changed, static_removed = diff_snapshots(self.static, static)
+        template_changed = template != self.template
+        self.content, self.static, self.template = content, static, template
+
+        if template_changed:
+            # load_template recompiles on the new mtime; every page embeds it
+            content_changed = sorted(path for path in content if path.endswith('.md'))
+
+        for from_path in content_changed:
+            if from_path.endswith('.md'):
+                self.build(from_path)
+        for from_path in content_removed:
+            dest_path = self.page_dest(from_path)
+            if from_path.endswith('.md') and os.path.isfile(dest_path):
+                print(f">>> Removing {dest_path}")
+                os.remove(dest_path)
+
+        for src_path in static_changed:
+            if os.path.basename(src_path) == '.DS_Store':
+                continue
+            dest_path = os.path.join(self.dest_dir, os.path.relpath(src_path, self.static_dir))
+            print(f">>> Copying {src_path}")
+            try:
+                # replace rather than overwrite: with --hardlink-assets dest_path may be
+                # the same file as src_path, and writing to it would truncate the source
+                copy_static.sync_file(src_path, dest_path, os.stat(src_path))
+            except OSError as e:
+                print(f"!!! {src_path}: {e}")
+        for src_path in static_removed:
+            dest_path = os.path.join(self.dest_dir, os.path.relpath(src_path, self.static_dir))
+            if os.path.isfile(dest_path):
+                print(f">>> Removing {dest_path}")
+                os.remove(dest_path)
+
+        return bool(content_changed or content_removed or static_changed or static_removed)
+
+def watch(basepath, content_dir, static_dir, template_path, dest_dir, port=8888,
+          interval=0.5):
+    '''Serves dest_dir on port and rebuilds on change until interrupted'''
+
+    notifier = ReloadNotifier()
+    handler = functools.partial(DevRequestHandler, directory=dest_dir, notifier=notifier)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f">>> Serving {dest_dir} at http://localhost:{port}/ with live reload")
+
+    watcher = SiteWatcher(basepath, content_dir, static_dir, template_path, dest_dir)
+    print(f">>> Watching {content_dir}, {static_dir} and {template_path} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            if watcher.poll():
+                notifier.notify()
+    except KeyboardInterrupt:
+        print(">>> Stopping watch mode")
+    finally:
+        server.shutdown()
+        server.server_close()